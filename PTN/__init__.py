@@ -1,22 +1,101 @@
 #!/usr/bin/env python
 
-import pkgutil
+import importlib
+import os
 import sys
 
-# Regex in python 2 is very slow so we check if the faster 'regex' library is available.
-faster_regex = pkgutil.find_loader("regex")
-if faster_regex is not None and sys.version_info[0] < 3:
-    re = faster_regex.load_module("regex")
-else:
-    re = pkgutil.find_loader("re").load_module("re")
-
+from .backend import (  # noqa: F401
+    available_regex_backends,
+    environment_variable,
+    get_regex_backend,
+    re,
+    set_regex_backend,
+)
+from .batch import ParseFailure, executors, parse_many, parse_parallel  # noqa: F401
+from .compact import CompactResult
+from .compiled import compiled_patterns
+from .guard import guard_counters, reset_guard_counters  # noqa: F401
 from .parse import PTN
 
+# These need modules like asyncio and sqlite3 that are slow to import, so are only
+# imported when first used.
+_lazy_attributes = {
+    "aparse": "aio",
+    "aparse_many": "aio",
+    "ParseCache": "cache",
+    "SQLiteParseCache": "cache",
+    "parse_columns": "columns",
+    "evaluate": "evaluation",
+    "parse_torrent": "torrent",
+    "parse_torrents": "torrent",
+    "LibraryIndex": "scan",
+    "scan_library": "scan",
+}
+
+if sys.version_info < (3, 7):
+    # Modules can't have a __getattr__, so import them straight away.
+    from .cache import ParseCache, SQLiteParseCache  # noqa: F401
+    from .columns import parse_columns  # noqa: F401
+    from .evaluation import evaluate  # noqa: F401
+    from .scan import LibraryIndex, scan_library  # noqa: F401
+    from .torrent import parse_torrent, parse_torrents  # noqa: F401
+
+
+def __getattr__(name):
+    module = _lazy_attributes.get(name)
+    if module is None:
+        raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
+    value = getattr(importlib.import_module("." + module, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_lazy_attributes))
+
+
 __author__ = "Giorgio Momigliano"
 __email__ = "gmomigliano@protonmail.com"
 __version__ = "2.8.1"
 __license__ = "MIT"
 
 
-def parse(name, standardise=True, coherent_types=False):
-    return PTN().parse(name, standardise, coherent_types)
+# Patterns are compiled as they're first needed. Call this to compile them all up front
+# instead, e.g. in a server before forking workers, so they share the compiled patterns
+# and no request pays for compiling them.
+def warmup():
+    compiled_patterns.warmup()
+
+
+# Only possible now that the parser has been imported (see backend.py).
+if os.environ.get(environment_variable) == "auto":
+    set_regex_backend("auto")
+
+# Parsers keep no per-name state, so one is shared by every call that uses the defaults.
+_default_parser = PTN()
+
+
+def parse(
+    name,
+    standardise=True,
+    coherent_types=False,
+    profiler=None,
+    engine="scan",
+    compact=False,
+    fields=None,
+    time_budget=None,
+    max_length=None,
+):
+    if (
+        profiler is None
+        and engine == "scan"
+        and time_budget is None
+        and max_length is None
+    ):
+        parser = _default_parser
+    else:
+        parser = PTN(profiler, engine, time_budget, max_length)
+    parts = parser.parse(name, standardise, coherent_types, fields)
+    if compact:
+        return CompactResult(parts)
+    return parts
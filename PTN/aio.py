@@ -0,0 +1,147 @@
+#!/usr/bin/env python
+
+# asyncio versions of PTN.parse and parse_many, which parse in an executor so the event
+# loop isn't blocked while the patterns are matched. Python 3.7+ only.
+
+import asyncio
+import itertools
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+
+from . import re
+from .batch import check_batch_options, executors, parse_chunk
+from .parse import PTN
+
+# Set up on first use in each process, so this also works in a process pool.
+_parser = None
+
+
+# `backend` is the regex backend of the process that sent the names, which a worker
+# process may not have started with (see batch._init_worker).
+def _parse_chunk(names, standardise, coherent_types, errors, backend):
+    global _parser
+    re.use(backend)
+    if _parser is None:
+        _parser = PTN()
+    return parse_chunk(_parser, names, standardise, coherent_types, errors)
+
+
+# `executor` is either an Executor, "thread" or "process" for a new pool that is shut
+# down afterwards, or None for the event loop's default (thread) executor.
+def check_executor(executor):
+    if not (
+        executor is None or isinstance(executor, Executor) or executor in executors
+    ):
+        raise ValueError(
+            "executor must be an Executor, None, or one of {}, got {!r}".format(
+                ", ".join(executors), executor
+            )
+        )
+
+
+# Returns the executor to use, and whether it was created here (and so should be shut
+# down when done).
+def _get_executor(executor):
+    if executor == "thread":
+        return ThreadPoolExecutor(), True
+    if executor == "process":
+        return ProcessPoolExecutor(), True
+    return executor, False
+
+
+async def aparse(name, standardise=True, coherent_types=False, executor=None):
+    check_executor(executor)
+    executor, owned = _get_executor(executor)
+    try:
+        results = await asyncio.get_running_loop().run_in_executor(
+            executor,
+            _parse_chunk,
+            [name],
+            standardise,
+            coherent_types,
+            "raise",
+            re.backend,
+        )
+    finally:
+        if owned:
+            executor.shutdown(wait=False)
+    return results[0]
+
+
+# Reads chunks from either an async or a regular iterable.
+async def _chunks(names, chunk_size):
+    if hasattr(names, "__aiter__"):
+        chunk = []
+        async for name in names:
+            chunk.append(name)
+            if len(chunk) == chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+    else:
+        iterator = iter(names)
+        while True:
+            chunk = list(itertools.islice(iterator, chunk_size))
+            if not chunk:
+                return
+            yield chunk
+
+
+async def _aparse_many(
+    names, standardise, coherent_types, executor, chunk_size, max_in_flight, errors
+):
+    loop = asyncio.get_running_loop()
+    executor, owned = _get_executor(executor)
+    pending = deque()
+    try:
+        async for chunk in _chunks(names, chunk_size):
+            pending.append(
+                loop.run_in_executor(
+                    executor,
+                    _parse_chunk,
+                    chunk,
+                    standardise,
+                    coherent_types,
+                    errors,
+                    re.backend,
+                )
+            )
+            # Stop reading names until the oldest chunk is done, so a fast producer
+            # can't queue up unbounded work.
+            if len(pending) < max_in_flight:
+                continue
+            for result in await pending.popleft():
+                yield result
+        while pending:
+            for result in await pending.popleft():
+                yield result
+    finally:
+        # Also reached when the caller is cancelled or stops iterating early.
+        for future in pending:
+            future.cancel()
+        if owned:
+            executor.shutdown(wait=False)
+
+
+# An async generator of parse results, in the same order as `names` (which can be an
+# async iterable). At most max_in_flight chunks of chunk_size names are being parsed at
+# once. `errors` is as for parse_many.
+def aparse_many(
+    names,
+    standardise=True,
+    coherent_types=False,
+    executor=None,
+    chunk_size=100,
+    max_in_flight=4,
+    errors="raise",
+):
+    check_batch_options(chunk_size, errors)
+    check_executor(executor)
+    if max_in_flight < 1:
+        raise ValueError(
+            "max_in_flight must be at least 1, got {}".format(max_in_flight)
+        )
+    return _aparse_many(
+        names, standardise, coherent_types, executor, chunk_size, max_in_flight, errors
+    )
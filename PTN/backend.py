@@ -0,0 +1,169 @@
+#!/usr/bin/env python
+
+# The regex module the parser uses: the standard library's `re`, or the third-party
+# `regex` module, if it's installed. Every module in the package does
+# `from . import re`, which is the `re` object below, so switching backend switches all
+# of them.
+#
+# The backend can be set with the PTN_REGEX_BACKEND environment variable ("re", "regex",
+# or "auto" to pick whichever parses fastest on this machine), or with
+# set_regex_backend(). The patterns are the same for both, so the results are too.
+
+import importlib
+import os
+import sys
+
+backends = ("re", "regex")
+environment_variable = "PTN_REGEX_BACKEND"
+
+# A few names of different shapes, for timing the backends against each other.
+sample_names = (
+    "The Walking Dead S05E03 720p HDTV x264-ASAP[ettv]",
+    "Dinosaur 13 2014 WEBrip XviD AC3 MiLLENiUM",
+    "Ice.Age.Collision.Course.2016.READNFO.720p.HDRIP.X264.AC3.TiTAN",
+    "The Simpsons - Complete Seasons S01 to S28 (1080p, 720p, DVDRip)",
+    "The Big Bus - Il fantabus (1976).720p.H264.ita.eng.Ac3.sub.ita.eng-MIRCrew",
+    "Shuddh Desi Romance 2013 Hindi 720p BluRay x264 AAC 5.1 MSubs - LOKiHD - Telly",
+    "Black Hollywood: 'They've Gotta Have Us' S01 complete (BBC, 2018) "
+    "(1280x720p HD, 50fps, soft Eng subs)",
+    "The 11th Hour with Brian Williams 2020 06 23 1080p WEBRip x265 HEVC-LM",
+    "Sea.Monsters..Series.2.Part.11.Oceans.Most.Powerful.1080p.HDTV.x264.AAC."
+    "MVGroup.org.mp4",
+    "Friends.S09E23E24.720p.BluRay.DD5.1.x264-NTb.mkv",
+    "Avatar The Last Airbender - The Complete Series 1080p [HEVC AAC] - SEPH1",
+)
+
+
+# Stands in for the backend's module: its public attributes (compile, search, sub,
+# IGNORECASE, ...) are copied onto this object, so using them costs no more than using
+# the module itself. `generation` goes up every time the backend changes, so compiled
+# regexes can tell when they need compiling again.
+class RegexBackend(object):
+    def __init__(self):
+        self.backend = None
+        self.generation = 0
+
+    def use(self, name):
+        if name not in backends:
+            raise ValueError(
+                "regex backend must be one of {}, got {!r}".format(
+                    ", ".join(backends), name
+                )
+            )
+        module = importlib.import_module(name)
+        if name == self.backend:
+            return
+        for attribute in dir(module):
+            if not attribute.startswith("_"):
+                setattr(self, attribute, getattr(module, attribute))
+        self.backend = name
+        self.generation += 1
+
+    def __repr__(self):
+        return "<regex backend {!r}>".format(self.backend)
+
+
+re = RegexBackend()
+
+
+# A module-level regex that's compiled with the current backend when first used, and
+# again whenever the backend changes.
+class LazyPattern(object):
+    __slots__ = ("pattern", "flags", "_regex", "_generation")
+
+    def __init__(self, pattern, flags=0):
+        self.pattern = pattern
+        self.flags = flags
+        self._regex = None
+        self._generation = None
+
+    @property
+    def regex(self):
+        if self._generation != re.generation:
+            self._regex = re.compile(self.pattern, self.flags)
+            self._generation = re.generation
+        return self._regex
+
+    @property
+    def groups(self):
+        return self.regex.groups
+
+    def match(self, *args):
+        return self.regex.match(*args)
+
+    def search(self, *args):
+        return self.regex.search(*args)
+
+    def sub(self, *args):
+        return self.regex.sub(*args)
+
+    def __repr__(self):
+        return "LazyPattern({!r})".format(self.pattern)
+
+
+def available_regex_backends():
+    available = []
+    for name in backends:
+        try:
+            importlib.import_module(name)
+        except ImportError:
+            continue
+        available.append(name)
+    return available
+
+
+def get_regex_backend():
+    return re.backend
+
+
+# Times parsing `names` (sample_names by default) with each available backend, and
+# returns the name of the fastest. The current backend is left as it was.
+def fastest_regex_backend(names=sample_names, repeat=3):
+    from .compiled import compiled_patterns
+    from .guard import clock
+    from .parse import PTN
+
+    available = available_regex_backends()
+    if len(available) == 1:
+        return available[0]
+    parser = PTN()
+    current = re.backend
+    timings = []
+    try:
+        for name in available:
+            re.use(name)
+            compiled_patterns.warmup()
+            best = None
+            for _ in range(repeat):
+                start = clock()
+                for torrent_name in names:
+                    parser.parse(torrent_name, True, False)
+                elapsed = clock() - start
+                if best is None or elapsed < best:
+                    best = elapsed
+            timings.append((best, name))
+    finally:
+        re.use(current)
+    return min(timings)[1]
+
+
+# `name` is one of `backends`, or "auto" for the fastest of them.
+def set_regex_backend(name):
+    if name == "auto":
+        name = fastest_regex_backend()
+    re.use(name)
+
+
+# The backend to start with. Regex in python 2 is very slow, so there the faster `regex`
+# library is used if it's available. "auto" can only be handled once the parser has been
+# imported, so `re` is used until then.
+def initial_backend():
+    name = os.environ.get(environment_variable)
+    if name and name != "auto":
+        return name
+    if sys.version_info[0] < 3 and "regex" in available_regex_backends():
+        return "regex"
+    return "re"
+
+
+re.use(initial_backend())
@@ -0,0 +1,495 @@
+#!/usr/bin/env python
+
+# Looks for regexes that could backtrack catastrophically. It checks every pattern
+# option, the language and genre tables, and the regexes used directly in parse.py,
+# post.py and context.py. The check flags quantifiers that can split the same text in
+# more than one way:
+#
+#   nested:    a repeated group containing a variable repeat, e.g. (?:\s+\w*)+
+#   adjacent:  two repeats in a row that can match the same characters, e.g. \s*[\s.]*
+#   branches:  a repeated alternation whose branches can start the same way,
+#              e.g. (a|ab)+
+#
+# Each flagged regex also gets a worst-case name: text that reaches the quantifier,
+# followed by its ambiguous characters over and over, and a character that makes the
+# match fail. PTN.parse is timed on it at growing lengths. A flag is only a problem if
+# the time grows super-linearly. The worst-case names can be saved as a corpus for
+# PTN.bench:
+#
+#   python -m PTN.backtracking [--output adversarial.json] [--static]
+#   python -m PTN.bench --corpus adversarial.json
+
+import argparse
+import ast
+import math
+import sys
+import time
+import warnings
+
+from . import context, post
+from .compiled import compiled_patterns, ignore_title_regexes, post_title_regex
+from .extras import genres, langs
+from .parse import PTN
+from .prefilter import sre_parse
+
+# The characters worst-case names are made of.
+universe = [chr(code) for code in range(32, 127)]
+
+# Repeats that can match at least this many times are worth flagging.
+many = 10
+
+# Fitted growth exponents above this are reported as super-linear.
+max_exponent = 1.5
+
+_atomic_ops = tuple(
+    op
+    for op in (
+        getattr(sre_parse, "ATOMIC_GROUP", None),
+        getattr(sre_parse, "POSSESSIVE_REPEAT", None),
+    )
+    if op is not None
+)
+
+_categories = {
+    sre_parse.CATEGORY_DIGIT: str.isdigit,
+    sre_parse.CATEGORY_NOT_DIGIT: lambda c: not c.isdigit(),
+    sre_parse.CATEGORY_SPACE: str.isspace,
+    sre_parse.CATEGORY_NOT_SPACE: lambda c: not c.isspace(),
+    sre_parse.CATEGORY_WORD: lambda c: c.isalnum() or c == "_",
+    sre_parse.CATEGORY_NOT_WORD: lambda c: not (c.isalnum() or c == "_"),
+}
+
+
+class Finding(object):
+    __slots__ = ("label", "pattern", "kind", "chars", "prefix", "pump", "timings")
+
+    def __init__(self, label, pattern, kind, chars, prefix, pump):
+        self.label = label
+        self.pattern = pattern
+        self.kind = kind
+        self.chars = chars  # The characters the quantifiers can both match.
+        self.prefix = prefix  # Text that gets the regex to the quantifier.
+        self.pump = pump  # Text that's repeated to make the name longer.
+        self.timings = []  # (length, seconds) pairs.
+
+    # A name that makes the regex try every way of splitting `length` characters.
+    def name(self, length):
+        repeats = max(1, (length - len(self.prefix)) // len(self.pump))
+        return self.prefix + self.pump * repeats + failing_suffix(self.chars)
+
+    # The slope of log(time) against log(length), 1.0 for linear growth.
+    def exponent(self):
+        if len(self.timings) < 2:
+            return None
+        (first_length, first_time), (last_length, last_time) = (
+            self.timings[0],
+            self.timings[-1],
+        )
+        return math.log(last_time / first_time) / math.log(last_length / first_length)
+
+    def super_linear(self):
+        exponent = self.exponent()
+        return exponent is not None and exponent > max_exponent
+
+    def __repr__(self):
+        return "Finding({!r}, {!r})".format(self.label, self.kind)
+
+
+def _fold(chars):
+    return set(chars) | set(c.swapcase() for c in chars)
+
+
+def _in_class(items, char):
+    negate = False
+    for op, av in items:
+        if op is sre_parse.NEGATE:
+            negate = True
+        elif op is sre_parse.LITERAL and char in _fold(chr(av)):
+            return not negate
+        elif op is sre_parse.RANGE and (
+            av[0] <= ord(char) <= av[1] or av[0] <= ord(char.swapcase()) <= av[1]
+        ):
+            return not negate
+        elif op is sre_parse.CATEGORY and _categories.get(av, bool)(char):
+            return not negate
+    return negate
+
+
+def _single_chars(op, av):
+    if op is sre_parse.LITERAL:
+        return _fold(chr(av)) & set(universe)
+    if op is sre_parse.NOT_LITERAL:
+        return set(universe) - _fold(chr(av))
+    if op is sre_parse.ANY:
+        return set(universe)
+    if op is sre_parse.IN:
+        return set(c for c in universe if _in_class(av, c))
+    return None
+
+
+def _is_repeat(op):
+    return op is sre_parse.MAX_REPEAT or op is sre_parse.MIN_REPEAT
+
+
+# The characters the node can start with, and whether it can match the empty string.
+def _first(op, av):
+    chars = _single_chars(op, av)
+    if chars is not None:
+        return chars, False
+    if op is sre_parse.SUBPATTERN:
+        return first_chars(av[-1])
+    if op is sre_parse.BRANCH:
+        chars, nullable = set(), False
+        for branch in av[1]:
+            branch_chars, branch_nullable = first_chars(branch)
+            chars |= branch_chars
+            nullable = nullable or branch_nullable
+        return chars, nullable
+    if _is_repeat(op):
+        chars, nullable = first_chars(av[2])
+        return chars, nullable or av[0] == 0
+    if op in (sre_parse.AT, sre_parse.ASSERT, sre_parse.ASSERT_NOT):
+        return set(), True
+    # Group references, atomic groups, etc.
+    return set(universe), True
+
+
+def first_chars(items):
+    chars = set()
+    for op, av in items:
+        node_chars, nullable = _first(op, av)
+        chars |= node_chars
+        if not nullable:
+            return chars, False
+    return chars, True
+
+
+# Every character the items can consume.
+def all_chars(items):
+    chars = set()
+    for op, av in items:
+        node_chars = _single_chars(op, av)
+        if node_chars is not None:
+            chars |= node_chars
+        elif op is sre_parse.SUBPATTERN:
+            chars |= all_chars(av[-1])
+        elif op is sre_parse.BRANCH:
+            for branch in av[1]:
+                chars |= all_chars(branch)
+        elif _is_repeat(op):
+            chars |= all_chars(av[2])
+    return chars
+
+
+# A short string the items match.
+def witness(items):
+    text = []
+    for op, av in items:
+        chars = _single_chars(op, av)
+        if chars is not None:
+            text.append(_pick(chars))
+        elif op is sre_parse.SUBPATTERN:
+            text.append(witness(av[-1]))
+        elif op is sre_parse.BRANCH:
+            text.append(witness(av[1][0]))
+        elif _is_repeat(op):
+            text.append(witness(av[2]) * av[0])
+    return "".join(text)
+
+
+# Prefers letters and digits, so witnesses look like (and are split like) names.
+def _pick(chars):
+    if not chars:
+        return ""
+    return sorted(chars, key=lambda c: (not c.isalnum(), c))[0]
+
+
+def failing_suffix(chars):
+    for suffix in ("!", "#", "~", "\x01"):
+        if suffix not in chars:
+            return suffix
+    return ""
+
+
+def _varies(op, av):
+    minimum, maximum, _ = av
+    return _is_repeat(op) and maximum > 1 and maximum != minimum
+
+
+def _repeats_many(op, av):
+    return _is_repeat(op) and av[1] >= many
+
+
+# The repeats that can start a match of the node.
+def _leading_repeats(op, av):
+    if _is_repeat(op):
+        return [(op, av)]
+    if op is sre_parse.SUBPATTERN:
+        return _leading_in(av[-1])
+    if op is sre_parse.BRANCH:
+        return [repeat for branch in av[1] for repeat in _leading_in(branch)]
+    return []
+
+
+def _leading_in(items):
+    repeats = []
+    for op, av in items:
+        repeats.extend(_leading_repeats(op, av))
+        if not _first(op, av)[1]:
+            break
+    return repeats
+
+
+# Variable repeats anywhere inside the items, not counting lookarounds.
+def _inner_repeats(items):
+    repeats = []
+    for op, av in items:
+        if op in _atomic_ops:
+            continue
+        if _is_repeat(op):
+            if _varies(op, av):
+                repeats.append((op, av))
+            repeats.extend(_inner_repeats(av[2]))
+        elif op is sre_parse.SUBPATTERN:
+            repeats.extend(_inner_repeats(av[-1]))
+        elif op is sre_parse.BRANCH:
+            for branch in av[1]:
+                repeats.extend(_inner_repeats(branch))
+    return repeats
+
+
+def _branches(items):
+    while len(items) == 1 and items[0][0] is sre_parse.SUBPATTERN:
+        items = list(items[0][1][-1])
+    if len(items) == 1 and items[0][0] is sre_parse.BRANCH:
+        return items[0][1][1]
+    return None
+
+
+def _walk(items, prefix, found):
+    items = list(items)
+    for i, (op, av) in enumerate(items):
+        here = prefix + witness(items[:i])
+        if op in _atomic_ops:
+            continue
+        if _is_repeat(op):
+            body = list(av[2])
+            if _repeats_many(op, av):
+                for inner_op, inner_av in _inner_repeats(body):
+                    chars = all_chars(inner_av[2])
+                    if chars:
+                        found("nested", chars, here, witness(body) or _pick(chars))
+                        break
+                branches = _branches(body)
+                if branches:
+                    starts = [first_chars(branch)[0] for branch in branches]
+                    for a in range(len(starts)):
+                        overlap = set()
+                        for b in range(a + 1, len(starts)):
+                            overlap = starts[a] & starts[b]
+                            if overlap:
+                                break
+                        if overlap:
+                            found("branches", overlap, here, witness(branches[a]))
+                            break
+            if _varies(op, av) and _repeats_many(op, av):
+                chars = all_chars(body)
+                for next_op, next_av in items[i + 1 :]:
+                    for lead_op, lead_av in _leading_repeats(next_op, next_av):
+                        overlap = chars & all_chars(lead_av[2])
+                        if _varies(lead_op, lead_av) and overlap:
+                            found("adjacent", overlap, here, _pick(overlap))
+                            break
+                    if not _first(next_op, next_av)[1]:
+                        break
+            _walk(body, here, found)
+        elif op is sre_parse.SUBPATTERN:
+            _walk(av[-1], here, found)
+        elif op is sre_parse.BRANCH:
+            for branch in av[1]:
+                _walk(branch, here, found)
+
+
+# The findings for one regex, at most one of each kind.
+def analyse(label, pattern):
+    try:
+        parsed = sre_parse.parse(pattern)
+    except Exception:
+        return []
+    findings = {}
+
+    def found(kind, chars, prefix, pump):
+        if kind not in findings:
+            findings[kind] = Finding(label, pattern, kind, chars, prefix, pump)
+
+    _walk(list(parsed), "", found)
+    return list(findings.values())
+
+
+# Regexes passed to re.* functions in the module's source, as string literals, names of
+# module-level strings, or "...".format() of those.
+def module_regexes(module):
+    with open(module.__file__) as source_file:
+        source = source_file.read()
+    # Invalid escapes in the source were already warned about when it was imported.
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        tree = ast.parse(source)
+    namespace = vars(module)
+
+    def resolve(node):
+        if isinstance(node, ast.Constant) and isinstance(node.value, str):
+            return node.value
+        if isinstance(node, ast.Name):
+            value = namespace.get(node.id)
+            return value if isinstance(value, str) else None
+        if (
+            isinstance(node, ast.Call)
+            and isinstance(node.func, ast.Attribute)
+            and node.func.attr == "format"
+            and not node.keywords
+        ):
+            template = resolve(node.func.value)
+            args = [resolve(arg) for arg in node.args]
+            if template is not None and None not in args:
+                return template.format(*args)
+        if isinstance(node, ast.BinOp) and isinstance(node.op, ast.Add):
+            left, right = resolve(node.left), resolve(node.right)
+            if left is not None and right is not None:
+                return left + right
+        return None
+
+    regexes = []
+    for node in ast.walk(tree):
+        if (
+            isinstance(node, ast.Call)
+            and isinstance(node.func, ast.Attribute)
+            and isinstance(node.func.value, ast.Name)
+            and node.func.value.id == "re"
+            and node.args
+        ):
+            pattern = resolve(node.args[0])
+            if pattern is not None:
+                label = "{}:{}".format(module.__name__.split(".")[-1], node.lineno)
+                regexes.append((label, pattern))
+    return regexes
+
+
+# (label, pattern) for every regex the parser uses.
+def parser_regexes():
+    regexes = []
+    for key, options in compiled_patterns:
+        for option in options:
+            regexes.append(("{}[{}]".format(key, option.index), option.pattern))
+    for table_name, table in (("langs", langs), ("genres", genres)):
+        for index, (pattern, _) in enumerate(table):
+            regexes.append(("{}[{}]".format(table_name, index), pattern))
+    regexes.append(("post_title_regex", post_title_regex.pattern))
+    for key, ignore_regexes in ignore_title_regexes.items():
+        for index, regex in enumerate(ignore_regexes):
+            regexes.append(("ignore_title[{}][{}]".format(key, index), regex.pattern))
+    regexes.append(("only_delimiters", context.only_delimiters.pattern))
+    # The package's `parse` attribute is the function, not the module.
+    for module in (sys.modules[PTN.__module__], post, context):
+        regexes.extend(module_regexes(module))
+    return regexes
+
+
+def find_problems(regexes=None):
+    findings = []
+    for label, pattern in regexes if regexes is not None else parser_regexes():
+        findings.extend(analyse(label, pattern))
+    return findings
+
+
+# Times PTN.parse on the finding's worst-case name at each length, stopping early once
+# a single parse takes longer than max_time seconds.
+def time_finding(finding, lengths=(64, 128, 256, 512, 1024), repeat=3, max_time=1.0):
+    parser = PTN()
+    clock = time.perf_counter
+    finding.timings = []
+    for length in lengths:
+        name = finding.name(length)
+        best = None
+        for _ in range(repeat):
+            start = clock()
+            parser.parse(name, True, False)
+            elapsed = clock() - start
+            if best is None or elapsed < best:
+                best = elapsed
+        finding.timings.append((len(name), best))
+        if best > max_time:
+            break
+    return finding
+
+
+# The distinct worst-case names for the findings, at the given length.
+def adversarial_corpus(findings, length=256):
+    names = []
+    seen = set()
+    for finding in findings:
+        name = finding.name(length)
+        if name not in seen:
+            seen.add(name)
+            names.append(name)
+    return names
+
+
+def format_findings(findings, out=sys.stdout):
+    for finding in findings:
+        line = "{:<28}{:<10}".format(finding.label, finding.kind)
+        if finding.timings:
+            length, seconds = finding.timings[-1]
+            line += "exponent {:.2f}, {:.1f}ms at {} chars{}".format(
+                finding.exponent() or 0.0,
+                seconds * 1000,
+                length,
+                "  SUPER-LINEAR" if finding.super_linear() else "",
+            )
+        out.write(line + "\n")
+
+
+def main(argv=None):
+    import json
+
+    parser = argparse.ArgumentParser(
+        prog="python -m PTN.backtracking",
+        description="Look for regexes in PTN that could backtrack catastrophically.",
+    )
+    parser.add_argument(
+        "--static", action="store_true", help="only flag regexes, don't time them"
+    )
+    parser.add_argument(
+        "--lengths",
+        default="64,128,256,512,1024",
+        help="comma-separated name lengths to time each flagged regex at",
+    )
+    parser.add_argument("--output", help="save the worst-case names to this JSON file")
+    parser.add_argument(
+        "--corpus-length", type=int, default=256, help="length of the saved names"
+    )
+    args = parser.parse_args(argv)
+
+    findings = find_problems()
+    if not args.static:
+        lengths = [int(length) for length in args.lengths.split(",")]
+        for finding in findings:
+            time_finding(finding, lengths)
+        findings.sort(key=lambda finding: -(finding.exponent() or 0.0))
+    format_findings(findings)
+    super_linear = [finding for finding in findings if finding.super_linear()]
+    sys.stdout.write(
+        "\n{} regexes flagged, {} super-linear\n".format(
+            len(findings), len(super_linear)
+        )
+    )
+    if args.output:
+        with open(args.output, "w") as output_file:
+            json.dump(
+                adversarial_corpus(findings, args.corpus_length), output_file, indent=4
+            )
+    return 1 if super_linear else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
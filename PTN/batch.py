@@ -0,0 +1,244 @@
+#!/usr/bin/env python
+
+# Helpers for parsing many names at once, reusing a single parser's precomputed state.
+
+import functools
+import itertools
+import os
+import sys
+from collections import deque, namedtuple
+
+from . import re
+from .compact import CompactResult
+from .compiled import compiled_patterns
+from .fields import field_closure
+from .guard import check_limits
+from .parse import PTN
+
+# What to do when a single name fails to parse: re-raise the exception, leave the name
+# out of the results, or put a ParseFailure in its place.
+error_modes = ("raise", "skip", "record")
+
+ParseFailure = namedtuple("ParseFailure", ["name", "error"])
+
+# The kinds of worker pool parse_parallel can use.
+executors = ("process", "thread")
+
+
+def check_batch_options(chunk_size, errors):
+    if chunk_size < 1:
+        raise ValueError("chunk_size must be at least 1, got {}".format(chunk_size))
+    if errors not in error_modes:
+        raise ValueError(
+            "errors must be one of {}, got {!r}".format(", ".join(error_modes), errors)
+        )
+
+
+# Lazily split an iterable into lists of at most chunk_size elements.
+def chunked(iterable, chunk_size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(itertools.islice(iterator, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def parse_chunk(parser, names, standardise, coherent_types, errors, fields=None):
+    results = []
+    for name in names:
+        try:
+            results.append(parser.parse(name, standardise, coherent_types, fields))
+        except Exception as e:
+            if errors == "raise":
+                raise
+            if errors == "record":
+                results.append(ParseFailure(name, e))
+    return results
+
+
+# Turns each result (but not ParseFailures) into a CompactResult.
+def compact_results(results):
+    for result in results:
+        if isinstance(result, dict):
+            result = CompactResult(result)
+        yield result
+
+
+def _parse_many(names, standardise, coherent_types, chunk_size, errors, fields, parser):
+    for chunk in chunked(names, chunk_size):
+        for result in parse_chunk(
+            parser, chunk, standardise, coherent_types, errors, fields
+        ):
+            yield result
+
+
+# Returns a generator of parse results, in the same order as `names`. Only chunk_size
+# names are read from `names` (and held in memory) at a time. With compact=True, the
+# results are CompactResults rather than dicts. `fields` is as for PTN.parse, and
+# `time_budget` and `max_length` as for PTN.
+def parse_many(
+    names,
+    standardise=True,
+    coherent_types=False,
+    chunk_size=1000,
+    errors="raise",
+    compact=False,
+    fields=None,
+    time_budget=None,
+    max_length=None,
+):
+    # Checked here rather than in the generator so bad options fail straight away.
+    check_batch_options(chunk_size, errors)
+    if fields is not None:
+        field_closure(fields)
+    parser = PTN(time_budget=time_budget, max_length=max_length)
+    results = _parse_many(
+        names, standardise, coherent_types, chunk_size, errors, fields, parser
+    )
+    if compact:
+        results = compact_results(results)
+    return results
+
+
+# Per-process state for parse_parallel's workers, set up once by the pool initializer
+# (or before Python 3.7, which has none, by the worker's first task) instead of in every
+# task.
+_worker_parser = None
+_worker_options = None
+
+
+def _init_worker(standardise, coherent_types, errors, time_budget, max_length, backend):
+    global _worker_parser, _worker_options
+    # Workers that aren't forked start with the backend from the environment, not one
+    # chosen with set_regex_backend(), so they're given the parent's.
+    re.use(backend)
+    # Patterns compile lazily, so compile them here rather than in the first chunk.
+    compiled_patterns.warmup()
+    _worker_parser = PTN(time_budget=time_budget, max_length=max_length)
+    _worker_options = (standardise, coherent_types, errors)
+
+
+def _parse_chunk_in_worker(names, setup=None):
+    if _worker_parser is None and setup is not None:
+        _init_worker(*setup)
+    return parse_chunk(_worker_parser, names, *_worker_options)
+
+
+# Runs `task` over chunks of names in `executor`, yielding the results of each chunk.
+# Only `window` chunks are in flight at a time, so neither the input nor the results are
+# ever held in memory all at once.
+def map_chunks(executor, task, names, chunk_size, window, ordered):
+    from concurrent.futures import FIRST_COMPLETED, wait
+
+    pending = deque()
+    try:
+        for chunk in chunked(names, chunk_size):
+            pending.append(executor.submit(task, chunk))
+            if len(pending) < window:
+                continue
+            if ordered:
+                done = [pending.popleft()]
+            else:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    pending.remove(future)
+            for future in done:
+                for result in future.result():
+                    yield result
+        while pending:
+            for result in pending.popleft().result():
+                yield result
+    finally:
+        for future in pending:
+            future.cancel()
+
+
+def _parse_parallel(
+    names,
+    standardise,
+    coherent_types,
+    workers,
+    chunk_size,
+    errors,
+    ordered,
+    executor,
+    limits,
+):
+    from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+    if executor == "thread":
+        # The threads all share one parser, as it keeps no state between parses.
+        task = functools.partial(
+            parse_chunk,
+            PTN(time_budget=limits[0], max_length=limits[1]),
+            standardise=standardise,
+            coherent_types=coherent_types,
+            errors=errors,
+        )
+        pool = ThreadPoolExecutor(max_workers=workers)
+    else:
+        setup = (standardise, coherent_types, errors) + limits + (re.backend,)
+        if sys.version_info < (3, 7):
+            # ProcessPoolExecutor has no initializer, so every task carries the setup.
+            task = functools.partial(_parse_chunk_in_worker, setup=setup)
+            pool = ProcessPoolExecutor(max_workers=workers)
+        else:
+            task = _parse_chunk_in_worker
+            pool = ProcessPoolExecutor(
+                max_workers=workers, initializer=_init_worker, initargs=setup
+            )
+    with pool:
+        for result in map_chunks(pool, task, names, chunk_size, workers * 2, ordered):
+            yield result
+
+
+# Like parse_many, but spreads chunks of names over a pool of workers. Results are
+# returned in the same order as `names`, unless `ordered` is False, in which case each
+# chunk's results are returned as soon as they're ready.
+#
+# The workers are processes by default. With executor="thread" they're threads sharing
+# a single parser, which avoids sending names and results between processes, but only
+# runs in parallel on free-threaded builds of Python (3.13t and later).
+#
+# Worker processes keep their own limit counters (see guard.py), so only threads add to
+# this process's.
+def parse_parallel(
+    names,
+    standardise=True,
+    coherent_types=False,
+    workers=None,
+    chunk_size=500,
+    errors="raise",
+    ordered=True,
+    executor="process",
+    compact=False,
+    time_budget=None,
+    max_length=None,
+):
+    check_batch_options(chunk_size, errors)
+    check_limits(time_budget, max_length)
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if workers < 1:
+        raise ValueError("workers must be at least 1, got {}".format(workers))
+    if executor not in executors:
+        raise ValueError(
+            "executor must be one of {}, got {!r}".format(
+                ", ".join(executors), executor
+            )
+        )
+    results = _parse_parallel(
+        names,
+        standardise,
+        coherent_types,
+        workers,
+        chunk_size,
+        errors,
+        ordered,
+        executor,
+        (time_budget, max_length),
+    )
+    if compact:
+        results = compact_results(results)
+    return results
@@ -0,0 +1,221 @@
+#!/usr/bin/env python
+
+# Benchmarks the parser over a corpus of names (tests/files/input.json by default),
+# reporting throughput, per-name latency percentiles, time spent in each stage of a
+# parse, and peak memory. Results can be saved as JSON to compare two versions:
+#
+#   python -m PTN.bench --output before.json
+#   python -m PTN.bench --output after.json
+#   python -m PTN.bench --compare before.json after.json
+
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+from . import __version__
+from .parse import PTN
+
+default_corpus = os.path.join(
+    os.path.dirname(__file__), "..", "tests", "files", "input.json"
+)
+
+# (standardise, coherent_types) for each mode.
+modes = {
+    "raw": (False, False),
+    "standardised": (True, False),
+    "coherent_types": (True, True),
+}
+
+
+def load_corpus(path):
+    with open(path) as corpus_file:
+        if path.endswith(".json"):
+            return json.load(corpus_file)
+        return [line.rstrip("\r\n") for line in corpus_file if line.strip()]
+
+
+def percentile(sorted_values, percent):
+    if not sorted_values:
+        return 0.0
+    index = int(round(percent / 100.0 * (len(sorted_values) - 1)))
+    return sorted_values[index]
+
+
+def time_mode(names, standardise, coherent_types, repeat):
+    parser = PTN()
+    clock = time.perf_counter
+    stage_times = dict((stage_name, 0.0) for stage_name, _ in PTN.stages)
+    latencies = []
+
+    # One untimed pass, so lazily-initialised state doesn't skew the first run.
+    for name in names:
+        parser.parse(name, standardise, coherent_types)
+
+    total_start = clock()
+    for _ in range(repeat):
+        for name in names:
+            name_start = clock()
+            context = parser.start(name, standardise, coherent_types)
+            stage_start = clock()
+            for stage_name, stage in PTN.stages:
+                stage(parser, context)
+                stage_end = clock()
+                stage_times[stage_name] += stage_end - stage_start
+                stage_start = stage_end
+            latencies.append(stage_start - name_start)
+    total = clock() - total_start
+
+    latencies.sort()
+    stage_total = sum(stage_times.values()) or 1.0
+    return {
+        "names_per_sec": len(latencies) / total,
+        "latency_ms": {
+            "mean": 1000 * sum(latencies) / len(latencies),
+            "p50": 1000 * percentile(latencies, 50),
+            "p95": 1000 * percentile(latencies, 95),
+            "p99": 1000 * percentile(latencies, 99),
+            "max": 1000 * latencies[-1],
+        },
+        "stages": dict(
+            (
+                stage_name,
+                {
+                    "total_ms": 1000 * stage_time,
+                    "share": stage_time / stage_total,
+                },
+            )
+            for stage_name, stage_time in stage_times.items()
+        ),
+    }
+
+
+# Measured in a separate pass, as tracing allocations slows everything down.
+def peak_memory(names, standardise, coherent_types):
+    parser = PTN()
+    tracemalloc.start()
+    try:
+        for name in names:
+            parser.parse(name, standardise, coherent_types)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def run(names, repeat=3, mode_names=None, corpus=None):
+    results = {
+        "version": __version__,
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "corpus": corpus,
+        "names": len(names),
+        "repeat": repeat,
+        "modes": {},
+    }
+    for mode_name in mode_names or modes:
+        standardise, coherent_types = modes[mode_name]
+        mode_results = time_mode(names, standardise, coherent_types, repeat)
+        mode_results["peak_memory_bytes"] = peak_memory(
+            names, standardise, coherent_types
+        )
+        results["modes"][mode_name] = mode_results
+    return results
+
+
+def print_results(results, out=sys.stdout):
+    out.write(
+        "PTN {} on {} {}, {} names x {}\n".format(
+            results["version"],
+            results["implementation"],
+            results["python"],
+            results["names"],
+            results["repeat"],
+        )
+    )
+    for mode_name, mode_results in results["modes"].items():
+        latency = mode_results["latency_ms"]
+        out.write(
+            "\n{}: {:.0f} names/s, p50 {:.3f}ms, p95 {:.3f}ms, p99 {:.3f}ms, "
+            "max {:.3f}ms, peak memory {:.1f}KiB\n".format(
+                mode_name,
+                mode_results["names_per_sec"],
+                latency["p50"],
+                latency["p95"],
+                latency["p99"],
+                latency["max"],
+                mode_results["peak_memory_bytes"] / 1024.0,
+            )
+        )
+        for stage_name, _ in PTN.stages:
+            stage = mode_results["stages"][stage_name]
+            out.write(
+                "    {:<32}{:>10.1f}ms {:>6.1%}\n".format(
+                    stage_name, stage["total_ms"], stage["share"]
+                )
+            )
+
+
+def compare(before, after, out=sys.stdout):
+    for mode_name, after_mode in after["modes"].items():
+        before_mode = before["modes"].get(mode_name)
+        if before_mode is None:
+            continue
+        out.write(
+            "{}: {:.0f} -> {:.0f} names/s ({:.2f}x), p99 {:.3f} -> {:.3f}ms\n".format(
+                mode_name,
+                before_mode["names_per_sec"],
+                after_mode["names_per_sec"],
+                after_mode["names_per_sec"] / before_mode["names_per_sec"],
+                before_mode["latency_ms"]["p99"],
+                after_mode["latency_ms"]["p99"],
+            )
+        )
+        for stage_name, after_stage in after_mode["stages"].items():
+            before_stage = before_mode["stages"].get(stage_name)
+            if before_stage:
+                out.write(
+                    "    {:<32}{:>10.1f} -> {:.1f}ms\n".format(
+                        stage_name, before_stage["total_ms"], after_stage["total_ms"]
+                    )
+                )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m PTN.bench", description="Benchmark PTN's parser."
+    )
+    parser.add_argument(
+        "--corpus",
+        default=default_corpus,
+        help="a JSON list of names, or a file with one name per line",
+    )
+    parser.add_argument("--repeat", type=int, default=3, help="passes over the corpus")
+    parser.add_argument(
+        "--mode", dest="modes", action="append", choices=sorted(modes), default=None
+    )
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    parser.add_argument(
+        "--compare",
+        nargs=2,
+        metavar=("BEFORE", "AFTER"),
+        help="compare two JSON results files instead of running",
+    )
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        with open(args.compare[0]) as before, open(args.compare[1]) as after:
+            compare(json.load(before), json.load(after))
+        return
+
+    results = run(load_corpus(args.corpus), args.repeat, args.modes, args.corpus)
+    print_results(results)
+    if args.output:
+        with open(args.output, "w") as output_file:
+            json.dump(results, output_file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
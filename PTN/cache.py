@@ -0,0 +1,270 @@
+#!/usr/bin/env python
+
+# Opt-in caching of parse results, for when the same names get parsed over and over.
+
+import hashlib
+import importlib
+import json
+import os
+import pkgutil
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from .parse import PTN
+
+_fingerprint = None
+
+
+# The names of PTN's modules. Parse results depend on so many of them (the pattern
+# tables, the parser, its context, standardising, compiling, the prefilter...) that all
+# of them are included, so none can be missed when code moves between them.
+def fingerprint_modules():
+    package_path = os.path.dirname(os.path.abspath(__file__))
+    return sorted(name for _, name, _ in pkgutil.iter_modules([package_path]))
+
+
+# Identifies the version of the parser and its pattern tables, so cached results from
+# an older version are never returned after an upgrade.
+def fingerprint():
+    global _fingerprint
+    if _fingerprint is None:
+        from . import __version__
+
+        package = __name__.rpartition(".")[0]
+        digest = hashlib.sha1(__version__.encode("utf-8"))
+        for name in fingerprint_modules():
+            digest.update(name.encode("utf-8"))
+            try:
+                source = pkgutil.get_data(package, name + ".py")
+            except (IOError, OSError):
+                source = None
+            if source is None:
+                # e.g. when installed without sources, use the module's contents
+                # instead.
+                module = importlib.import_module("." + name, package)
+                source = repr(sorted(vars(module).items())).encode("utf-8")
+            digest.update(source)
+        _fingerprint = digest.hexdigest()
+    return _fingerprint
+
+
+# Results only contain strings, numbers, booleans, and lists of the first two, so
+# copying the lists is enough to stop callers from changing a cached result.
+def copy_parts(parts):
+    return dict(
+        (key, list(value) if isinstance(value, list) else value)
+        for key, value in parts.items()
+    )
+
+
+class ParseCache(object):
+    def __init__(self, maxsize=10000):
+        if maxsize < 1:
+            raise ValueError("maxsize must be at least 1, got {}".format(maxsize))
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._results = OrderedDict()
+        self._lock = threading.Lock()
+
+    def parse(self, name, standardise=True, coherent_types=False):
+        key = (fingerprint(), name, standardise, coherent_types)
+        with self._lock:
+            parts = self._results.get(key)
+            if parts is not None:
+                # Moved to the end, as the most recently used (Python 2 has no
+                # OrderedDict.move_to_end).
+                self._results[key] = self._results.pop(key)
+                self.hits += 1
+                return copy_parts(parts)
+            self.misses += 1
+
+        parts = PTN().parse(name, standardise, coherent_types)
+        with self._lock:
+            self._results.pop(key, None)
+            self._results[key] = copy_parts(parts)
+            while len(self._results) > self.maxsize:
+                self._results.popitem(last=False)
+                self.evictions += 1
+        return parts
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "size": len(self._results),
+                "maxsize": self.maxsize,
+            }
+
+    def clear(self):
+        with self._lock:
+            self._results.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def __len__(self):
+        return len(self._results)
+
+
+# A persistent cache, stored in an SQLite database. Results are stored as JSON, keyed by
+# a hash of the name and the parse options. The whole cache is emptied whenever the
+# fingerprint changes, i.e. when PTN or its patterns are updated.
+class SQLiteParseCache(object):
+    def __init__(self, path, max_entries=None, max_age=None):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_age = max_age  # In seconds.
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._connection:
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)"
+            )
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS results ("
+                "key TEXT PRIMARY KEY, parts TEXT NOT NULL, created REAL NOT NULL)"
+            )
+            self._connection.execute(
+                "CREATE INDEX IF NOT EXISTS results_created ON results (created)"
+            )
+            row = self._connection.execute(
+                "SELECT value FROM meta WHERE key = 'fingerprint'"
+            ).fetchone()
+            if row is None or row[0] != fingerprint():
+                self._connection.execute("DELETE FROM results")
+                self._connection.execute(
+                    "INSERT OR REPLACE INTO meta (key, value) "
+                    "VALUES ('fingerprint', ?)",
+                    (fingerprint(),),
+                )
+            # Kept up to date by this object, so limits can be checked without counting
+            # the rows on every insert.
+            self._count = self._connection.execute(
+                "SELECT COUNT(*) FROM results"
+            ).fetchone()[0]
+
+    @staticmethod
+    def result_key(name, standardise, coherent_types):
+        digest = hashlib.sha1(name.encode("utf-8")).hexdigest()
+        return "{}:{:d}{:d}".format(digest, bool(standardise), bool(coherent_types))
+
+    def parse(self, name, standardise=True, coherent_types=False):
+        return self.parse_many([name], standardise, coherent_types)[0]
+
+    # Looks up all the names in one query, parses the ones that are missing, and stores
+    # them in a single transaction.
+    def parse_many(self, names, standardise=True, coherent_types=False):
+        names = list(names)
+        keys = [self.result_key(name, standardise, coherent_types) for name in names]
+        cached = self.get_many(set(keys))
+
+        results = []
+        new_results = {}
+        parser = PTN()
+        for name, key in zip(names, keys):
+            if key in cached:
+                results.append(copy_parts(cached[key]))
+            else:
+                if key not in new_results:
+                    new_results[key] = parser.parse(name, standardise, coherent_types)
+                results.append(copy_parts(new_results[key]))
+        self.put_many(new_results)
+        return results
+
+    # Runs `query` (which has "{}" where a list of keys goes) for batches of the keys,
+    # as SQLite limits how many parameters a query can have.
+    def _select_keys(self, query, keys):
+        keys = list(keys)
+        for i in range(0, len(keys), 500):
+            batch = keys[i : i + 500]
+            for row in self._connection.execute(
+                query.format(",".join("?" * len(batch))), batch
+            ):
+                yield row
+
+    def get_many(self, keys):
+        with self._lock:
+            return dict(
+                (key, json.loads(parts))
+                for key, parts in self._select_keys(
+                    "SELECT key, parts FROM results WHERE key IN ({})", keys
+                )
+            )
+
+    # With limits, only the results past them are removed, using the index on
+    # `created`, so filling a large cache doesn't scan the whole table on every insert.
+    def put_many(self, results):
+        if not results:
+            return
+        now = time.time()
+        with self._lock, self._connection:
+            replaced = 0
+            if self.max_entries is not None:
+                replaced = sum(
+                    count
+                    for count, in self._select_keys(
+                        "SELECT COUNT(*) FROM results WHERE key IN ({})", results
+                    )
+                )
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO results (key, parts, created) VALUES (?, ?, ?)",
+                [(key, json.dumps(parts), now) for key, parts in results.items()],
+            )
+            self._count += len(results) - replaced
+            if self.max_age is not None:
+                self._remove_expired(self.max_age)
+            if self.max_entries is not None and self._count > self.max_entries:
+                self._count -= self._connection.execute(
+                    "DELETE FROM results WHERE key IN ("
+                    "SELECT key FROM results ORDER BY created LIMIT ?)",
+                    (self._count - self.max_entries,),
+                ).rowcount
+
+    def _remove_expired(self, max_age):
+        removed = self._connection.execute(
+            "DELETE FROM results WHERE created < ?", (time.time() - max_age,)
+        ).rowcount
+        self._count -= removed
+        return removed
+
+    # Removes results older than max_age seconds, then the oldest results until there
+    # are at most max_entries left. Returns how many were removed.
+    def prune(self, max_entries=None, max_age=None):
+        if max_entries is None:
+            max_entries = self.max_entries
+        if max_age is None:
+            max_age = self.max_age
+
+        removed = 0
+        with self._lock, self._connection:
+            if max_age is not None:
+                removed += self._remove_expired(max_age)
+            if max_entries is not None:
+                removed += self._connection.execute(
+                    "DELETE FROM results WHERE key IN ("
+                    "SELECT key FROM results ORDER BY created DESC LIMIT -1 OFFSET ?)",
+                    (max_entries,),
+                ).rowcount
+            # Also picks up results other connections have added or removed.
+            self._count = self._connection.execute(
+                "SELECT COUNT(*) FROM results"
+            ).fetchone()[0]
+        return removed
+
+    def clear(self):
+        with self._lock, self._connection:
+            self._connection.execute("DELETE FROM results")
+            self._count = 0
+
+    def close(self):
+        self._connection.close()
+
+    def __len__(self):
+        with self._lock:
+            return self._connection.execute("SELECT COUNT(*) FROM results").fetchone()[
+                0
+            ]
@@ -0,0 +1,215 @@
+#!/usr/bin/env python
+
+# Parses a batch of names straight into one column per key, for analytics, instead of a
+# list of dicts. The column types come from `types` in patterns.py: integers are stored
+# in arrays of 64-bit ints, booleans in bitmaps, and everything else in lists.
+
+import csv
+import json
+from array import array
+
+from .batch import parse_many
+from .compact import limit_keys, result_keys
+from .patterns import types
+
+# Python 2's array has no "q", but its "l" is 64 bits on 64-bit Linux and macOS.
+try:
+    integer_typecode = array("q").typecode
+except ValueError:
+    integer_typecode = "l"
+
+
+class Bitmap(object):
+    __slots__ = ("bits", "length")
+
+    def __init__(self):
+        self.bits = bytearray()
+        self.length = 0
+
+    def append(self, value):
+        if self.length % 8 == 0:
+            self.bits.append(0)
+        if value:
+            self.bits[self.length >> 3] |= 1 << (self.length & 7)
+        self.length += 1
+
+    def __getitem__(self, index):
+        if not 0 <= index < self.length:
+            raise IndexError(index)
+        return bool(self.bits[index >> 3] & (1 << (index & 7)))
+
+    def __len__(self):
+        return self.length
+
+    def __iter__(self):
+        for index in range(self.length):
+            yield self[index]
+
+
+# A row's value is either an int, a list of ints (e.g. a range of seasons), or None.
+# Each row's ints are values[offsets[i]:offsets[i + 1]], `valid` is the null mask, and
+# `lists` marks the rows whose value was a list.
+class IntegerColumn(object):
+    kind = "integer"
+
+    def __init__(self):
+        self.values = array(integer_typecode)
+        self.offsets = array(integer_typecode, [0])
+        self.valid = Bitmap()
+        self.lists = Bitmap()
+
+    def append(self, value):
+        if isinstance(value, list):
+            self.values.extend(value)
+        elif value is not None:
+            self.values.append(value)
+        self.offsets.append(len(self.values))
+        self.valid.append(value is not None)
+        self.lists.append(isinstance(value, list))
+
+    def __getitem__(self, index):
+        if not self.valid[index]:
+            return None
+        values = self.values[self.offsets[index] : self.offsets[index + 1]]
+        if self.lists[index]:
+            return values.tolist()
+        return values[0]
+
+    def __len__(self):
+        return len(self.valid)
+
+
+# Booleans are only ever True when present, so a row is either True or None.
+class BooleanColumn(object):
+    kind = "boolean"
+
+    def __init__(self):
+        self.valid = Bitmap()
+
+    def append(self, value):
+        self.valid.append(value is not None)
+
+    def __getitem__(self, index):
+        return True if self.valid[index] else None
+
+    def __len__(self):
+        return len(self.valid)
+
+
+class StringColumn(object):
+    kind = "string"
+
+    def __init__(self):
+        self.values = []
+
+    def append(self, value):
+        self.values.append(value)
+
+    def __getitem__(self, index):
+        return self.values[index]
+
+    def __len__(self):
+        return len(self.values)
+
+
+column_classes = {"integer": IntegerColumn, "boolean": BooleanColumn}
+
+# parse_columns doesn't use limits, so leaves out the keys they set.
+column_keys = tuple(key for key in result_keys if key not in limit_keys)
+
+
+class Columns(object):
+    def __init__(self, keys=column_keys):
+        self.keys = tuple(keys)
+        self.columns = dict(
+            (key, column_classes.get(types.get(key), StringColumn)())
+            for key in self.keys
+        )
+        self.length = 0
+
+    def append(self, parts):
+        for key in self.keys:
+            self.columns[key].append(parts.get(key))
+        self.length += 1
+
+    def __getitem__(self, key):
+        return self.columns[key]
+
+    def __len__(self):
+        return self.length
+
+    # The dict PTN.parse returned for the row.
+    def row(self, index):
+        parts = {}
+        for key in self.keys:
+            value = self.columns[key][index]
+            if value is not None:
+                parts[key] = value
+        return parts
+
+    # Each row as a JSON object, as written by the CLI's batch mode.
+    def iter_json(self):
+        columns = [(json.dumps(key), self.columns[key]) for key in self.keys]
+        for index in range(self.length):
+            fields = []
+            for key, column in columns:
+                value = column[index]
+                if value is not None:
+                    fields.append(key + ":" + json.dumps(value, separators=(",", ":")))
+            yield "{" + ",".join(fields) + "}"
+
+    def write_jsonl(self, out):
+        for line in self.iter_json():
+            out.write(line + "\n")
+
+    # A column per key, with missing values left empty and lists written as JSON.
+    def write_csv(self, out):
+        writer = csv.writer(out)
+        writer.writerow(self.keys)
+        columns = [self.columns[key] for key in self.keys]
+        for index in range(self.length):
+            row = []
+            for column in columns:
+                value = column[index]
+                if value is None:
+                    value = ""
+                elif isinstance(value, list):
+                    value = json.dumps(value)
+                row.append(value)
+            writer.writerow(row)
+
+    # A dict of NumPy arrays (which must be installed). Integer columns without lists
+    # are masked int64 arrays, booleans are bool arrays (False when missing), and the
+    # rest are object arrays.
+    def to_numpy(self):
+        import numpy
+
+        arrays = {}
+        for key in self.keys:
+            column = self.columns[key]
+            if column.kind == "boolean":
+                arrays[key] = numpy.array(list(column.valid), dtype=bool)
+            elif column.kind == "integer" and not any(column.lists):
+                valid = numpy.array(list(column.valid), dtype=bool)
+                data = numpy.zeros(self.length, dtype=numpy.int64)
+                data[valid] = numpy.array(column.values, dtype=numpy.int64)
+                arrays[key] = numpy.ma.masked_array(data, mask=~valid)
+            else:
+                data = numpy.empty(self.length, dtype=object)
+                for index in range(self.length):
+                    data[index] = column[index]
+                arrays[key] = data
+        return arrays
+
+
+# Parses `names` (as parse_many does) into a Columns. Names that fail to parse either
+# raise or, with errors="skip", are left out.
+def parse_columns(
+    names, standardise=True, coherent_types=False, chunk_size=1000, errors="raise"
+):
+    if errors not in ("raise", "skip"):
+        raise ValueError("errors must be 'raise' or 'skip', got {!r}".format(errors))
+    columns = Columns()
+    for parts in parse_many(names, standardise, coherent_types, chunk_size, errors):
+        columns.append(parts)
+    return columns
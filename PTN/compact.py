@@ -0,0 +1,136 @@
+#!/usr/bin/env python
+
+# A compact, read-only alternative to the dicts PTN.parse returns, for keeping millions
+# of results in memory. Each result stores a bitmask of which keys are present and a
+# tuple of their values, and values that repeat a lot (e.g. "1080p" or "H.264") share
+# a single string object.
+
+try:
+    from collections.abc import Mapping
+except ImportError:  # Python 2
+    from collections import Mapping
+
+from .compiled import compiled_patterns
+from .extras import genres, langs
+from .patterns import patterns_ordered
+
+# Only set by parsers with limits (see guard.py).
+limit_keys = ("truncated", "degraded")
+
+# Every key a parse can return, in the order they're stored in ("site" is already in
+# patterns_ordered).
+result_keys = (
+    tuple(["title"] + patterns_ordered + ["episodeName", "encoder", "excess"])
+    + limit_keys
+)
+key_bits = dict((key, 1 << i) for i, key in enumerate(result_keys))
+
+
+def _vocabulary():
+    words = ["Available"]
+    words.extend(lang_clean for _, lang_clean in langs)
+    words.extend(genre_clean for _, genre_clean in genres)
+    for _, options in compiled_patterns:
+        words.extend(option.replace for option in options if option.replace)
+    return dict((word, word) for word in words if isinstance(word, str))
+
+
+# Maps each standardised value to a single shared copy of it. Values of the other keys
+# (e.g. "1080p", which isn't replaced) are added as they're seen, up to
+# max_vocabulary_size, as they come from a small set too.
+vocabulary = _vocabulary()
+max_vocabulary_size = 10000
+
+# Keys whose values are mostly unique, so aren't worth interning.
+free_text_keys = frozenset(["title", "episodeName", "encoder", "site", "excess"])
+
+
+def _intern_string(value):
+    shared = vocabulary.get(value)
+    if shared is None:
+        if len(vocabulary) >= max_vocabulary_size:
+            return value
+        shared = vocabulary.setdefault(value, value)
+    return shared
+
+
+def intern_value(key, value):
+    if key in free_text_keys:
+        return tuple(value) if isinstance(value, list) else value
+    if isinstance(value, str):
+        return _intern_string(value)
+    if isinstance(value, list):
+        return tuple(_intern_string(v) if isinstance(v, str) else v for v in value)
+    return value
+
+
+class CompactResult(Mapping):
+    # _extra holds any keys that aren't in result_keys, and is almost always None.
+    __slots__ = ("_mask", "_values", "_extra")
+
+    def __init__(self, parts):
+        mask = 0
+        values = []
+        extra = None
+        for key in result_keys:
+            if key in parts:
+                mask |= key_bits[key]
+                values.append(intern_value(key, parts[key]))
+        if len(values) != len(parts):
+            extra = dict(
+                (key, intern_value(key, value))
+                for key, value in parts.items()
+                if key not in key_bits
+            )
+        self._mask = mask
+        self._values = tuple(values)
+        self._extra = extra
+
+    def __getitem__(self, key):
+        bit = key_bits.get(key)
+        if bit is None or not self._mask & bit:
+            if self._extra is not None and key in self._extra:
+                return self._value(self._extra[key])
+            raise KeyError(key)
+        # The value's position is the number of present keys before it.
+        return self._value(self._values[bin(self._mask & (bit - 1)).count("1")])
+
+    # Lists are stored as tuples, so give out a new list each time like a dict would.
+    @staticmethod
+    def _value(value):
+        if isinstance(value, tuple):
+            return list(value)
+        return value
+
+    def __contains__(self, key):
+        bit = key_bits.get(key)
+        if bit is not None and self._mask & bit:
+            return True
+        return self._extra is not None and key in self._extra
+
+    def __iter__(self):
+        mask = self._mask
+        for key in result_keys:
+            if mask & key_bits[key]:
+                yield key
+        if self._extra is not None:
+            for key in self._extra:
+                yield key
+
+    def __len__(self):
+        return len(self._values) + (len(self._extra) if self._extra else 0)
+
+    # The same dict PTN.parse would have returned, though the keys may be in a
+    # different order.
+    def to_dict(self):
+        parts = dict(zip(self, map(self._value, self._values)))
+        if self._extra is not None:
+            for key, value in self._extra.items():
+                parts[key] = self._value(value)
+        return parts
+
+    def __reduce__(self):
+        return (CompactResult, (self.to_dict(),))
+
+    def __repr__(self):
+        return "CompactResult({!r})".format(self.to_dict())
@@ -0,0 +1,231 @@
+#!/usr/bin/env python
+
+# The pattern options in patterns.py, normalised and compiled once at import. Building
+# these in every parse call (and relying on `re`'s own cache, which the ~300 options
+# overflow) made recompiling the regexes a large part of each parse.
+
+import math
+
+from . import re
+from .backend import LazyPattern
+from .extras import link_patterns, patterns_ignore_title
+from .patterns import patterns, patterns_allow_overlap, patterns_ordered, types
+from .prefilter import required_literals
+from .standardise import compile_transforms
+
+# These keys' patterns handle their own boundaries, so they aren't wrapped in \b...\b.
+unbounded_keys = ("season", "episode", "site", "language", "genre")
+
+
+# Handles all the optional/missing tuple elements into a consistent list.
+def normalise_pattern_options(pattern_options):
+    pattern_options_norm = []
+
+    if isinstance(pattern_options, tuple):
+        pattern_options = [pattern_options]
+    elif not isinstance(pattern_options, list):
+        pattern_options = [(pattern_options, None, None)]
+    for options in pattern_options:
+        if len(options) == 2:  # No transformation
+            pattern_options_norm.append(options + (None,))
+        elif isinstance(options, tuple):
+            if isinstance(options[2], tuple):
+                pattern_options_norm.append(tuple(list(options[:2]) + [[options[2]]]))
+            elif isinstance(options[2], list):
+                pattern_options_norm.append(options)
+            else:
+                pattern_options_norm.append(
+                    tuple(list(options[:2]) + [[(options[2], [])]])
+                )
+
+        else:
+            pattern_options_norm.append((options, None, None))
+    pattern_options = pattern_options_norm
+    return pattern_options
+
+
+# Marks lazily computed attributes that haven't been computed yet.
+_unset = object()
+
+
+# The regex and its required literals are only worked out when first used, as doing so
+# for every option takes most of the time it takes to import PTN.
+class CompiledPattern(object):
+    __slots__ = (
+        "key",
+        "index",
+        "pattern",
+        "_regex",
+        "_literals",
+        "_generation",
+        "replace",
+        "transforms",
+        "transform",
+    )
+
+    def __init__(self, key, index, pattern, replace, transforms):
+        self.key = key
+        self.index = index  # Position within the key's options, first match wins.
+        self.pattern = pattern
+        self._regex = None
+        self._generation = None
+        self._literals = _unset
+        self.replace = replace
+        self.transforms = transforms
+        self.transform = compile_transforms(transforms)
+
+    # Compiled again if the regex backend has changed (see backend.py).
+    @property
+    def regex(self):
+        if self._generation != re.generation:
+            self._regex = re.compile(self.pattern, re.IGNORECASE)
+            self._generation = re.generation
+        return self._regex
+
+    # One of these must be in the lowercased name for the regex to match (see
+    # prefilter.py), None if they couldn't be worked out.
+    @property
+    def literals(self):
+        if self._literals is _unset:
+            self._literals = required_literals(self.pattern)
+        return self._literals
+
+    def __repr__(self):
+        return "CompiledPattern({!r}, {}, {!r})".format(
+            self.key, self.index, self.pattern
+        )
+
+
+def has_literal(literals, lowered):
+    for literal in literals:
+        if literal in lowered:
+            return True
+    return False
+
+
+# A node in a key's scan tree: a single regex alternating all the options below it. If
+# it doesn't match anywhere in a name, none of those options can, so they're skipped.
+class ScanNode(object):
+    __slots__ = ("regex", "children")
+
+    def __init__(self, options, children):
+        self.regex = LazyPattern(
+            "|".join("(?:{})".format(option.pattern) for option in options),
+            re.IGNORECASE,
+        )
+        self.children = children
+
+
+# Groups the options into about sqrt(n) nodes, recursively, until each leaf is a single
+# option. Returns the option itself if there's only one.
+def build_scan_tree(options):
+    if len(options) == 1:
+        return options[0]
+    size = int(math.ceil(len(options) / math.ceil(math.sqrt(len(options)))))
+    children = [
+        build_scan_tree(options[i : i + size]) for i in range(0, len(options), size)
+    ]
+    return ScanNode(options, children)
+
+
+# `re` tries every alternative at every position, so a combined regex costs about as
+# much as its options do separately. It only pays off for keys with many options that
+# rarely match, not for keys with few, very long options (like language).
+min_scan_tree_options = 10
+
+
+class CompiledPatternSet(object):
+    def __init__(self, patterns, patterns_ordered, types, patterns_allow_overlap):
+        self.types = dict(types)
+        self.allow_overlap = frozenset(patterns_allow_overlap)
+        self.ordered = []
+        for key in patterns_ordered:
+            options = []
+            normalised = normalise_pattern_options(patterns[key])
+            for index, (pattern, replace, transforms) in enumerate(normalised):
+                if key not in unbounded_keys:
+                    pattern = r"\b(?:{})\b".format(pattern)
+                options.append(
+                    CompiledPattern(key, index, pattern, replace, transforms)
+                )
+            self.ordered.append((key, options))
+        self.by_key = dict(self.ordered)
+        self._scan_trees = None
+
+    # Built when first used, like the regexes themselves.
+    @property
+    def scan_trees(self):
+        if self._scan_trees is None:
+            self._scan_trees = dict(
+                (key, build_scan_tree(options))
+                for key, options in self.ordered
+                if len(options) >= min_scan_tree_options
+            )
+        return self._scan_trees
+
+    # The key's options that could match in `lowered` (the name, from prefilter_text()),
+    # in order. Options are only dropped when their required literals are missing, so
+    # none of their matches can exist, and using these instead of every option gives
+    # exactly the same results.
+    def scan(self, key, lowered):
+        return [
+            option
+            for option in self.by_key[key]
+            if option.literals is None or has_literal(option.literals, lowered)
+        ]
+
+    # The key's options that could match in `name`, in order, found by searching the
+    # key's scan tree. Like scan(), this gives exactly the same results as every option.
+    def combined_scan(self, key, name):
+        tree = self.scan_trees.get(key)
+        if tree is None:
+            return self.by_key[key]
+        candidates = []
+        stack = [tree]
+        while stack:
+            node = stack.pop()
+            if isinstance(node, CompiledPattern):
+                candidates.append(node)
+            elif node.regex.search(name):
+                stack.extend(reversed(node.children))
+        return candidates
+
+    # Compiles every option up front, e.g. before forking worker processes.
+    def warmup(self):
+        for _, options in self.ordered:
+            for option in options:
+                getattr(option, "regex")
+                getattr(option, "literals")
+
+    # Iterates over (key, options) pairs, in the order the keys must be matched.
+    def __iter__(self):
+        return iter(self.ordered)
+
+    def __getitem__(self, key):
+        return self.by_key[key]
+
+    def __contains__(self, key):
+        return key in self.by_key
+
+    def __len__(self):
+        return len(self.ordered)
+
+
+compiled_patterns = CompiledPatternSet(
+    patterns, patterns_ordered, types, patterns_allow_overlap
+)
+
+# The regexes in patterns_ignore_title, for each key.
+ignore_title_regexes = dict(
+    (key, [LazyPattern(pattern, re.IGNORECASE) for pattern in ignore_patterns])
+    for key, ignore_patterns in patterns_ignore_title.items()
+)
+
+# Splits the torrent name at the (guessed) end of the title, a season, year, or
+# resolution.
+post_title_regex = LazyPattern(
+    "(?:{}|{}|720p|1080p)".format(
+        link_patterns(patterns["season"]), link_patterns(patterns["year"])
+    ),
+    re.IGNORECASE,
+)
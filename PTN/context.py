@@ -0,0 +1,236 @@
+#!/usr/bin/env python
+
+# The state of a single parse. A new context is made for every name, so a PTN parser
+# holds no per-name state and can be shared between threads. The post-processing
+# functions in post.py are passed the context as `self`.
+
+from . import re
+from .backend import LazyPattern
+from .compiled import ignore_title_regexes, post_title_regex
+from .extras import exceptions
+from .guard import clock
+from .patterns import delimiters
+from .prefilter import prefilter_text
+from .spans import SpanSet
+
+only_delimiters = LazyPattern(delimiters + r"*\Z")
+
+
+class ParseContext(object):
+    __slots__ = (
+        "torrent_name",
+        "standardise",
+        "coherent_types",
+        "parts",
+        "part_slices",
+        "match_slices",
+        "fields",
+        "clean_name",
+        "lowered",
+        "deadline",
+        "degraded",
+        "truncated",
+        "_title_boundary",
+        "_ignore_before",
+    )
+
+    # `fields` is the set of keys whose values are needed (see fields.py), or None for
+    # all of them. `deadline` is the clock() time the parse should stop by, if any (see
+    # guard.py).
+    def __init__(self, name, standardise, coherent_types, fields=None, deadline=None):
+        self.torrent_name = name.strip()
+        self.standardise = standardise
+        self.coherent_types = coherent_types
+        self.fields = fields
+        self.deadline = deadline
+        self.degraded = False
+        self.truncated = False
+        self.parts = {}
+        self.part_slices = {}
+        # Everything that's been matched, to be left out of the title and excess.
+        self.match_slices = SpanSet()
+
+        # What the patterns are matched against, and the text to check their required
+        # literals against (see prefilter.py).
+        self.clean_name = self.torrent_name.replace("_", " ")
+        self.lowered = prefilter_text(self.clean_name)
+        # Worked out the first time they're needed.
+        self._title_boundary = None
+        self._ignore_before = {}
+
+    # Where the (guessed) title ends in clean_name: the start of the first season, year
+    # or resolution, or 0 if there isn't one.
+    def title_boundary(self):
+        if self._title_boundary is None:
+            match = post_title_regex.search(self.clean_name)
+            self._title_boundary = match.start() if match else 0
+        return self._title_boundary
+
+    # Only use part of the torrent name after the (guessed) title to avoid matching
+    # certain patterns that could show up in a release title (see
+    # patterns_ignore_title in extras.py). Matches of the key that start before the
+    # returned index are ignored.
+    def ignore_before_index(self, key):
+        index = self._ignore_before.get(key)
+        if index is None:
+            index = 0
+            ignore_regexes = ignore_title_regexes.get(key)
+            if ignore_regexes is not None:
+                if not ignore_regexes or any(
+                    regex.search(self.clean_name) for regex in ignore_regexes
+                ):
+                    index = self.title_boundary()
+            self._ignore_before[key] = index
+        return index
+
+    # Whether the parse has run past its deadline. Once it has, it stays degraded.
+    def out_of_time(self):
+        if not self.degraded and self.deadline is not None and clock() > self.deadline:
+            self.degraded = True
+        return self.degraded
+
+    def needs(self, keys):
+        if self.fields is None:
+            return True
+        for key in keys:
+            if key in self.fields:
+                return True
+        return False
+
+    def _part(self, name, match_slice, clean, overwrite=False):
+        if overwrite or name not in self.parts:
+            if self.coherent_types:
+                if name not in ["title", "episodeName"] and not isinstance(clean, bool):
+                    if not isinstance(clean, list):
+                        clean = [clean]
+            else:
+                if isinstance(clean, list) and len(clean) == 1:
+                    clean = clean[0]  # Avoids making a list if it only has 1 element
+
+            self.parts[name] = clean
+            self.part_slices[name] = match_slice
+
+        # Ignored patterns will still be considered 'matched' to remove them from
+        # excess.
+        if match_slice:
+            self.match_slices.add(*match_slice)
+
+    @staticmethod
+    def _clean_string(string):
+        clean = re.sub(r"^( -|\(|\[)", "", string)
+        if clean.find(" ") == -1 and clean.find(".") != -1:
+            # 4 dots likely means we want an ellipsis and a space
+            clean = re.sub(r"\.{4,}", "... ", clean)
+
+            # Replace any instances of less than 3 dots with a space
+            # Lookarounds are used to prevent the 3-dots (ellipses) from being replaced
+            clean = re.sub(r"(?<!\.)\.\.(?!\.)", " ", clean)
+            clean = re.sub(r"(?<!\.)\.(?!\.\.)", " ", clean)
+
+        clean = re.sub(r"_", " ", clean)
+        clean = re.sub(r"([\[)_\]]|- )$", "", clean).strip()
+        clean = clean.strip(" _-")
+
+        return clean
+
+    def process_title(self):
+        unmatched = self.unmatched_list(keep_punctuation=False)
+
+        # Use the first one as the title
+        if unmatched:
+            title_start, title_end = unmatched[0][0], unmatched[0][1]
+
+            # If our unmatched is after the first 3 matches, we assume the title is
+            # missing (or more likely got parsed as something else), as no torrents have
+            # it that far away from the beginning of the release title.
+            if (
+                len(self.part_slices) > 3
+                and title_start
+                > sorted(self.part_slices.values(), key=lambda s: s[0])[3][0]
+            ):
+                self._part("title", None, "")
+
+            raw = self.torrent_name[title_start:title_end]
+            # Something in square brackets with 3 chars or fewer is too weird to be
+            # right.
+            # If this seems too arbitrary, make it any square bracket, and Mother test
+            # case will lose its translated title (which is mostly fine I think).
+            m = re.search(r"\(|(?:\[(?:.{,3}\]|[^\]]*\d[^\]]*\]?))", raw, flags=re.I)
+            if m:
+                relative_title_end = m.start()
+                raw = raw[:relative_title_end]
+                title_end = relative_title_end + title_start
+            # Similar logic as above, but looking at beginning of string unmatched
+            # brackets.
+            m = re.search(r"^(?:\)|\[.*\])", raw)
+            if m:
+                relative_title_start = m.end()
+                raw = raw[relative_title_start:]
+                title_start = relative_title_start + title_start
+            clean = self._clean_string(raw)
+            # Re-add title_start to unrelative the index from raw to self.torrent_name
+            self._part("title", (title_start, title_end), clean)
+        else:
+            self._part("title", None, "")
+
+    # The (start, end) ranges of the name outside the match slices, optionally leaving
+    # out those that are just punctuation.
+    def unmatched_list(self, keep_punctuation=True):
+        name = self.torrent_name
+        # If nothing matched, assume the whole thing is the title
+        if not self.match_slices:
+            unmatched = [(0, len(name))]
+            if keep_punctuation:
+                unmatched.insert(0, (len(name), len(name)))
+            return unmatched
+
+        unmatched = self.match_slices.gaps(len(name))
+        if not keep_punctuation:
+            unmatched = [
+                (start, end)
+                for start, end in unmatched
+                if not only_delimiters.match(name, start, end)
+            ]
+        return unmatched
+
+    def fix_known_exceptions(self):
+        # Considerations for results that are known to cause issues, such
+        # as media with years in them but without a release year.
+        for exception in exceptions:
+            incorrect_key, incorrect_value = exception["incorrect_parse"]
+            if (
+                self.parts["title"] == exception["parsed_title"]
+                and incorrect_key in self.parts
+            ):
+                if self.parts[incorrect_key] == incorrect_value or (
+                    self.coherent_types and incorrect_value in self.parts[incorrect_key]
+                ):
+                    self.parts.pop(incorrect_key)
+                    self._part("title", None, exception["actual_title"], overwrite=True)
+
+    def get_unmatched(self):
+        name = self.torrent_name
+        return "".join(name[start:end] for start, end in self.unmatched_list())
+
+    def clean_unmatched(self):
+        unmatched = []
+        for start, end in self.unmatched_list():
+            unmatched.append(self.torrent_name[start:end])
+
+        unmatched_clean = []
+        for raw in unmatched:
+            clean = re.sub(r"(^[-_.\s(),]+)|([-.\s,]+$)", "", raw)
+            clean = re.sub(r"[()/]", " ", clean)
+            unmatched_clean += re.split(r"\.\.+|\s+", clean)
+
+        filtered = []
+        for extra in unmatched_clean:
+            # re.fullmatch() is not available in python 2.7, so we manually do it with
+            # \Z.
+            if not re.match(
+                r"(?:Complete|Season|Full)?[\]\[,.+\- ]*(?:Complete|Season|Full)?\Z",
+                extra,
+                re.IGNORECASE,
+            ):
+                filtered.append(extra)
+        return filtered
@@ -0,0 +1,305 @@
+#!/usr/bin/env python
+
+# Scores PTN against a labelled corpus: parses every name (in parallel) and compares
+# each result to its expected parts, giving the precision and recall of each field, the
+# names whose results don't match, and how fast they were parsed. With the results of
+# an earlier run as a baseline, also lists the names whose results have changed, e.g.
+# to review an upgrade. The report is a JSON-serialisable dict.
+#
+# python -m PTN.evaluation tests/files/input.json tests/files/output_raw.json --raw
+
+import argparse
+import itertools
+import json
+import sys
+
+try:
+    from itertools import zip_longest
+except ImportError:  # Python 2
+    from itertools import izip_longest as zip_longest
+
+from .batch import ParseFailure, parse_many, parse_parallel
+from .guard import clock
+
+# Parts that aren't labelled in tests/files/output_*.json, so aren't scored by default.
+default_ignore = ("encoder", "excess", "site")
+
+_missing = object()
+
+
+# {key: {"expected": ..., "got": ...}} for the scored keys where `result` differs from
+# `expected`, leaving out "expected" for keys that weren't expected and "got" for keys
+# that weren't found. With partial=True, keys that weren't expected aren't scored, for
+# corpora that only label some of each name's parts.
+def compare(expected, result, ignore=default_ignore, partial=False):
+    diff = {}
+    for key, value in expected.items():
+        if key in ignore:
+            continue
+        got = result.get(key, _missing)
+        if got is _missing:
+            diff[key] = {"expected": value}
+        elif got != value:
+            diff[key] = {"expected": value, "got": got}
+    if not partial:
+        for key, got in result.items():
+            if key not in expected and key not in ignore:
+                diff[key] = {"got": got}
+    return diff
+
+
+# {key: {"before": ..., "after": ...}} for every key that differs between two results,
+# leaving out "before" or "after" for keys that are only in one of them.
+def changes(before, after):
+    diff = {}
+    for key in set(before) | set(after):
+        old = before.get(key, _missing)
+        new = after.get(key, _missing)
+        if old != new:
+            diff[key] = {}
+            if old is not _missing:
+                diff[key]["before"] = old
+            if new is not _missing:
+                diff[key]["after"] = new
+    return diff
+
+
+def _ratio(numerator, denominator):
+    if not denominator:
+        return None
+    return float(numerator) / denominator
+
+
+def _scores(counts):
+    true_positives, false_positives, false_negatives = counts
+    return {
+        "true_positives": true_positives,
+        "false_positives": false_positives,
+        "false_negatives": false_negatives,
+        "precision": _ratio(true_positives, true_positives + false_positives),
+        "recall": _ratio(true_positives, true_positives + false_negatives),
+    }
+
+
+# Parses `inputs` and compares each result to the parts at the same position in
+# `expected`. Both can be any iterables, of names and of dicts, and are read as the
+# names are parsed rather than all at once. `baseline`, if given, is the results of an
+# earlier run, in the same order. Raises ValueError if they're not all the same length.
+#
+# A scored key counts as a true positive if its value is right, a false negative if
+# it's missing, a false positive if it wasn't expected, and both if its value is wrong.
+# `ignore` and `partial` are as for compare(), and `workers`, `chunk_size` and
+# `executor` as for parse_parallel (or parse_many, with workers=1). At most
+# `max_examples` mismatches, failures and changes are listed, though all are counted.
+def evaluate(
+    inputs,
+    expected,
+    standardise=True,
+    coherent_types=False,
+    baseline=None,
+    ignore=default_ignore,
+    partial=False,
+    workers=None,
+    chunk_size=500,
+    executor="process",
+    max_examples=None,
+):
+    names, to_parse = itertools.tee(inputs)
+    if workers == 1:
+        results = parse_many(
+            to_parse, standardise, coherent_types, chunk_size, "record"
+        )
+    else:
+        results = parse_parallel(
+            to_parse,
+            standardise,
+            coherent_types,
+            workers,
+            chunk_size,
+            "record",
+            executor=executor,
+        )
+    rows = [names, results, expected]
+    if baseline is not None:
+        rows.append(baseline)
+
+    ignore = frozenset(ignore)
+    fields = {}
+    mismatches = []
+    failures = []
+    changed = []
+    counts = {"names": 0, "exact": 0, "mismatched": 0, "failed": 0, "changed": 0}
+    start = clock()
+    for row in zip_longest(*rows, fillvalue=_missing):
+        if _missing in row:
+            raise ValueError(
+                "inputs, expected and baseline must all be the same length, but one "
+                "ran out after {} names".format(counts["names"])
+            )
+        name, result, labels = row[:3]
+        counts["names"] += 1
+        failed = isinstance(result, ParseFailure)
+        if failed:
+            counts["failed"] += 1
+            if max_examples is None or len(failures) < max_examples:
+                failures.append({"name": name, "error": repr(result.error)})
+            result = {}
+        elif baseline is not None:
+            diff = changes(row[3], result)
+            if diff:
+                counts["changed"] += 1
+                if max_examples is None or len(changed) < max_examples:
+                    changed.append({"name": name, "diff": diff})
+
+        diff = compare(labels, result, ignore, partial)
+        for key in labels:
+            if key not in ignore and key not in diff:
+                fields.setdefault(key, [0, 0, 0])[0] += 1
+        for key, values in diff.items():
+            field = fields.setdefault(key, [0, 0, 0])
+            if "got" in values:
+                field[1] += 1
+            if "expected" in values:
+                field[2] += 1
+        if failed:
+            continue
+        if not diff:
+            counts["exact"] += 1
+        else:
+            counts["mismatched"] += 1
+            if max_examples is None or len(mismatches) < max_examples:
+                mismatches.append({"name": name, "diff": diff})
+    seconds = clock() - start
+
+    total = [sum(field[i] for field in fields.values()) for i in range(3)]
+    report = dict(counts)
+    report.update(
+        {
+            "seconds": seconds,
+            "names_per_second": _ratio(counts["names"], seconds),
+            "total": _scores(total),
+            "fields": dict((key, _scores(fields[key])) for key in sorted(fields)),
+            "mismatches": mismatches,
+            "failures": failures,
+        }
+    )
+    if baseline is not None:
+        report["changes"] = changed
+    else:
+        del report["changed"]
+    return report
+
+
+# The items in a JSON file holding a list, or in a file with one item per line (e.g.
+# the output of `cli.py --batch`), read one at a time.
+def load_items(path, json_lines):
+    if path.endswith(".json"):
+        with open(path) as input_file:
+            for item in json.load(input_file):
+                yield item
+        return
+    with open(path) as input_file:
+        for line in input_file:
+            line = line.rstrip("\r\n")
+            if json_lines:
+                yield json.loads(line)
+            elif line:
+                yield line
+
+
+def format_report(report, out):
+    out.write(
+        "{} names, {} exact, {} mismatched, {} failed, in {:.2f}s "
+        "({:.0f} names/s)\n".format(
+            report["names"],
+            report["exact"],
+            report["mismatched"],
+            report["failed"],
+            report["seconds"],
+            report["names_per_second"] or 0,
+        )
+    )
+    if "changes" in report:
+        out.write("{} changed since the baseline\n".format(report["changed"]))
+    out.write(
+        "\n{:<20}{:>10}{:>10}{:>10}\n".format("field", "precision", "recall", "n")
+    )
+    rows = sorted(report["fields"].items())
+    rows.append(("total", report["total"]))
+    for key, scores in rows:
+        out.write(
+            "{:<20}{:>10}{:>10}{:>10}\n".format(
+                key,
+                _percent(scores["precision"]),
+                _percent(scores["recall"]),
+                scores["true_positives"] + scores["false_negatives"],
+            )
+        )
+
+
+def _percent(value):
+    if value is None:
+        return "-"
+    return "{:.2%}".format(value)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m PTN.evaluation",
+        description="Score PTN against a labelled corpus.",
+    )
+    parser.add_argument(
+        "inputs", help="names, as a JSON list or a text file with one per line"
+    )
+    parser.add_argument(
+        "expected",
+        help="expected parts for each name, as a JSON list or one JSON object per line",
+    )
+    parser.add_argument("--raw", action="store_true", help="don't standardise results")
+    parser.add_argument("--coherent-types", action="store_true")
+    parser.add_argument(
+        "--partial", action="store_true", help="only score the labelled keys"
+    )
+    parser.add_argument(
+        "--ignore",
+        default=",".join(default_ignore),
+        help="comma-separated keys not to score",
+    )
+    parser.add_argument(
+        "--baseline", help="results of an earlier run, to list the names that changed"
+    )
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--chunk-size", type=int, default=500)
+    parser.add_argument("--executor", choices=("process", "thread"), default="process")
+    parser.add_argument("--max-examples", type=int, default=None)
+    parser.add_argument("--output", help="save the report to this JSON file")
+    args = parser.parse_args(argv)
+
+    baseline = None
+    if args.baseline:
+        baseline = load_items(args.baseline, True)
+    report = evaluate(
+        load_items(args.inputs, False),
+        load_items(args.expected, True),
+        not args.raw,
+        args.coherent_types,
+        baseline,
+        [key for key in args.ignore.split(",") if key],
+        args.partial,
+        args.workers,
+        args.chunk_size,
+        args.executor,
+        args.max_examples,
+    )
+    format_report(report, sys.stderr)
+    if args.output:
+        with open(args.output, "w") as output_file:
+            json.dump(report, output_file, indent=4)
+    else:
+        json.dump(report, sys.stdout, indent=4)
+        sys.stdout.write("\n")
+    return 1 if report["mismatched"] or report["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,55 @@
+#!/usr/bin/env python
+
+# Works out which keys' values have to be computed to get some requested fields exactly
+# right, for PTN.parse's `fields` argument.
+#
+# Every pattern is still matched, as the title (and the overlap checks between keys)
+# depend on where every key matched. What can be skipped is turning a match into a value
+# (splitting, standardising, etc.) for keys that nothing requested depends on, along
+# with the title, excess and post-processing steps that only change unrequested keys.
+
+from .compact import result_keys
+from .extras import exceptions
+
+# The keys whose values each key's final value can depend on, through post-processing.
+field_dependencies = {
+    # The title can be changed based on the year, season and episode
+    # (try_vague_season_episode, use_year_as_title_if_absent), and on known exceptions.
+    "title": set(["year", "season", "episode"])
+    | set(exception["incorrect_parse"][0] for exception in exceptions),
+    # ...which in turn can be removed or set based on the title.
+    "year": set(["title"]),
+    "season": set(["title"]),
+    "episode": set(["title"]),
+    "episodeName": set(["title"]),
+    "language": set(["subtitles"]),
+    "subtitles": set(["language"]),
+    # The excess is what's left after the title and episode name, and the encoder and
+    # site are taken from it (or from before it).
+    "excess": set(["title", "episodeName", "encoder", "site"]),
+    "encoder": set(["title", "episodeName", "excess", "site"]),
+    "site": set(["title", "episodeName", "excess", "encoder"]),
+}
+for exception in exceptions:
+    field_dependencies.setdefault(exception["incorrect_parse"][0], set()).add("title")
+
+_closures = {}
+
+
+# The requested fields plus everything they depend on.
+def field_closure(fields):
+    fields = frozenset(fields)
+    closure = _closures.get(fields)
+    if closure is None:
+        unknown = fields.difference(result_keys)
+        if unknown:
+            raise ValueError("Unknown fields: {}".format(", ".join(sorted(unknown))))
+        closure = set()
+        todo = list(fields)
+        while todo:
+            field = todo.pop()
+            if field not in closure:
+                closure.add(field)
+                todo.extend(field_dependencies.get(field, ()))
+        closure = _closures[fields] = frozenset(closure)
+    return closure
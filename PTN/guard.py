@@ -0,0 +1,67 @@
+#!/usr/bin/env python
+
+# Limits on how much work a single name can cost, for PTN(time_budget=...,
+# max_length=...), and counts of how often they kicked in, to alert on.
+#
+# A name longer than max_length is cut down before parsing, and its result has
+# "truncated": True. A parse that runs past its time budget stops matching pattern
+# keys and skips post-processing, and its (partial) result has "degraded": True. The
+# budget is only checked between pattern keys and stages, so a single slow regex can
+# still overrun it.
+
+import threading
+import time
+
+from .backend import LazyPattern
+from .patterns import delimiters
+
+# Python 2 has no perf_counter.
+clock = getattr(time, "perf_counter", time.time)
+
+delimiter = LazyPattern(delimiters)
+
+_counters = {"parsed": 0, "truncated": 0, "degraded": 0}
+_counters_lock = threading.Lock()
+
+
+def check_limits(time_budget, max_length):
+    if time_budget is not None and not time_budget > 0:
+        raise ValueError("time_budget must be positive, got {}".format(time_budget))
+    if max_length is not None and max_length < 1:
+        raise ValueError("max_length must be at least 1, got {}".format(max_length))
+
+
+# The first max_length characters of the name. If that cuts a word in two, the partial
+# word (and the delimiter before it) is dropped too, unless the name has no delimiter
+# to cut at.
+def truncate_name(name, max_length):
+    if len(name) <= max_length:
+        return name
+    end = max_length
+    if not delimiter.match(name, end):
+        start = end
+        while start > 0 and not delimiter.match(name, start - 1):
+            start -= 1
+        if start > 0:
+            end = start - 1
+    return name[:end]
+
+
+def count(parsed, truncated, degraded):
+    with _counters_lock:
+        _counters["parsed"] += parsed
+        _counters["truncated"] += truncated
+        _counters["degraded"] += degraded
+
+
+# How many names have been parsed with limits, and how many of those were truncated or
+# degraded, in this process.
+def guard_counters():
+    with _counters_lock:
+        return dict(_counters)
+
+
+def reset_guard_counters():
+    with _counters_lock:
+        for event in _counters:
+            _counters[event] = 0
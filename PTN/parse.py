@@ -1,76 +1,114 @@
 #!/usr/bin/env python
 from . import re
-from .extras import exceptions, genres, langs, link_patterns, patterns_ignore_title
-from .patterns import delimiters, patterns, patterns_ordered, types, patterns_allow_overlap
-from .post import post_processing_after_excess, post_processing_before_excess
+from .compiled import compiled_patterns, normalise_pattern_options, post_title_regex
+from .context import ParseContext
+from .extras import patterns_ignore_title
+from .fields import field_closure
+from .guard import check_limits, clock, count, truncate_name
+from .patterns import delimiters, types
+from .post import (
+    post_processing_after_excess,
+    post_processing_before_excess,
+    post_processing_changes,
+)
+from .spans import SpanSet
+from .standardise import compile_transforms, standardiser
+
+
+# "scan" skips pattern options that can't match, by first checking the name for their
+# required literals (see CompiledPatternSet.scan). "combined" skips them by searching
+# regexes that combine groups of a key's options (see CompiledPatternSet.combined_scan),
+# which is slower than "scan" on the test corpus. "reference" tries every option. All
+# three give the same results.
+engines = ("scan", "combined", "reference")
 
 
 class PTN(object):
-    def __init__(self):
-        self.torrent_name = None
-        self.parts = None
-        self.part_slices = None
-        self.match_slices = None
-        self.standardise = None
-        self.coherent_types = None
-
-        self.post_title_pattern = "(?:{}|{}|720p|1080p)".format(
-            link_patterns(patterns["season"]), link_patterns(patterns["year"])
-        )
-
-    def _part(self, name, match_slice, clean, overwrite=False):
-        if overwrite or name not in self.parts:
-            if self.coherent_types:
-                if name not in ["title", "episodeName"] and not isinstance(clean, bool):
-                    if not isinstance(clean, list):
-                        clean = [clean]
-            else:
-                if isinstance(clean, list) and len(clean) == 1:
-                    clean = clean[0]  # Avoids making a list if it only has 1 element
-
-            self.parts[name] = clean
-            self.part_slices[name] = match_slice
-
-        # Ignored patterns will still be considered 'matched' to remove them from excess.
-        if match_slice:
-            self.match_slices.append(match_slice)
-
-    @staticmethod
-    def _clean_string(string):
-        clean = re.sub(r"^( -|\(|\[)", "", string)
-        if clean.find(" ") == -1 and clean.find(".") != -1:
-            # 4 dots likely means we want an ellipsis and a space
-            clean = re.sub(r"\.{4,}", "... ", clean)
-
-            # Replace any instances of less than 3 dots with a space
-            # Lookarounds are used to prevent the 3-dots (ellipses) from being replaced
-            clean = re.sub(r"(?<!\.)\.\.(?!\.)", " ", clean)
-            clean = re.sub(r"(?<!\.)\.(?!\.\.)", " ", clean)
-
-        clean = re.sub(r"_", " ", clean)
-        clean = re.sub(r"([\[)_\]]|- )$", "", clean).strip()
-        clean = clean.strip(" _-")
-
-        return clean
-
-    def parse(self, name, standardise, coherent_types):
-        name = name.strip()
-        self.parts = {}
-        self.part_slices = {}
-        self.torrent_name = name
-        self.match_slices = []
-        self.standardise = standardise
-        self.coherent_types = coherent_types
-
-        for key, pattern_options in [(key, patterns[key]) for key in patterns_ordered]:
-            pattern_options = self.normalise_pattern_options(pattern_options)
-
-            for (pattern, replace, transforms) in pattern_options:
-                if key not in ("season", "episode", "site", "language", "genre"):
-                    pattern = r"\b(?:{})\b".format(pattern)
-
-                clean_name = re.sub(r"_", " ", self.torrent_name)
-                matches = self.get_matches(pattern, clean_name, key)
+    # The profiler, if given, is told how long each pattern option took to match, and
+    # what happened to its matches (see profiler.py). `time_budget` (in seconds) and
+    # `max_length` limit how long a single name can take to parse (see guard.py).
+    def __init__(self, profiler=None, engine="scan", time_budget=None, max_length=None):
+        if engine not in engines:
+            raise ValueError(
+                "engine must be one of {}, got {!r}".format(", ".join(engines), engine)
+            )
+        check_limits(time_budget, max_length)
+        self.engine = engine
+        self.profiler = profiler
+        self.time_budget = time_budget
+        self.max_length = max_length
+        self.post_title_pattern = post_title_regex
+
+    # Kept for compatibility, the per-name state and its methods are in context.py.
+    _clean_string = staticmethod(ParseContext._clean_string)
+
+    # Safe to call from several threads at once, as all the state of a parse is kept in
+    # its own ParseContext.
+    #
+    # If `fields` is given, only those keys are returned, and work that can't affect
+    # them is skipped. They have the same values as in a full parse.
+    #
+    # A name cut down to max_length has "truncated": True in its result, and one whose
+    # parse ran out of time has "degraded": True, whatever the fields.
+    def parse(self, name, standardise, coherent_types, fields=None):
+        context = self.start(name, standardise, coherent_types, fields)
+        for stage_name, stage in self.stages:
+            # Once out of time, only the title is still worked out.
+            if context.degraded and stage_name != "process_title":
+                continue
+            stage(self, context)
+            if context.deadline is not None:
+                context.out_of_time()
+
+        parts = context.parts
+        if fields is not None:
+            parts = dict((key, value) for key, value in parts.items() if key in fields)
+        if self.time_budget is not None or self.max_length is not None:
+            if context.truncated:
+                parts["truncated"] = True
+            if context.degraded:
+                parts["degraded"] = True
+            count(1, context.truncated, context.degraded)
+        return parts
+
+    # Creates the state for parsing a new torrent name.
+    def start(self, name, standardise, coherent_types, fields=None):
+        if fields is not None:
+            fields = field_closure(fields)
+        deadline = None
+        if self.time_budget is not None:
+            deadline = clock() + self.time_budget
+        truncated = False
+        if self.max_length is not None:
+            stripped = name.strip()
+            name = truncate_name(stripped, self.max_length)
+            truncated = len(name) < len(stripped)
+        context = ParseContext(name, standardise, coherent_types, fields, deadline)
+        context.truncated = truncated
+        return context
+
+    def match_patterns(self, context):
+        profiler = self.profiler
+        clean_name = context.clean_name
+        deadline = context.deadline
+        # The slices of the parts that other matches can't overlap.
+        blocking = SpanSet(closed=False)
+        for key, pattern_options in compiled_patterns:
+            if deadline is not None and context.out_of_time():
+                break
+            if self.engine == "scan":
+                pattern_options = compiled_patterns.scan(key, context.lowered)
+            elif self.engine == "combined":
+                pattern_options = compiled_patterns.combined_scan(key, clean_name)
+            for option in pattern_options:
+                if profiler is None:
+                    matches = self.get_matches(option.regex, clean_name, key, context)
+                else:
+                    scan_start = profiler.clock()
+                    matches = self.get_matches(option.regex, clean_name, key, context)
+                    profiler.record_scan(
+                        option, profiler.clock() - scan_start, len(matches)
+                    )
 
                 if not matches:
                     continue
@@ -88,94 +126,100 @@ class PTN(object):
                     matches[match_index]["end"],
                 )
                 if (
-                    key in self.parts
+                    key in context.parts
                 ):  # We can skip ahead if we already have a matched part
-                    self._part(key, (match_start, match_end), None, overwrite=False)
+                    context._part(key, (match_start, match_end), None, overwrite=False)
                     continue
 
-                index = self.get_match_indexes(match)
+                # Strictly inside since punctuation can overlap.
+                part_overlaps = blocking.strictly_contains(
+                    match_start
+                ) or blocking.strictly_contains(match_end)
 
-                if key in ("season", "episode"):
-                    clean = self.get_season_episode(match)
-                elif key == "subtitles":
-                    clean = self.get_subtitles(match)
-                elif key in ("language", "genre"):
-                    clean = self.split_multi(match)
-                elif key in types.keys() and types[key] == "boolean":
-                    clean = True
-                else:
-                    clean = match[index["clean"]]
-                    if key in types.keys() and types[key] == "integer":
-                        clean = int(clean)
-
-                if self.standardise:
-                    clean = self.standardise_clean(clean, key, replace, transforms)
-
-                part_overlaps = False
-                for part, part_slices in self.part_slices.items():
-                    if part not in patterns_allow_overlap:
-                        # Strict smaller/larger than since punctuation can overlap.
-                        if (
-                            (part_slices[0] < match_start < part_slices[1])
-                            or (part_slices[0] < match_end < part_slices[1])
-                        ):
-                            part_overlaps = True
-                            break
-
-                if not part_overlaps:
-                    self._part(key, (match_start, match_end), clean)
-
-        self.process_title()
-        self.fix_known_exceptions()
-
-        unmatched = self.get_unmatched()
-        for f in post_processing_before_excess:
-            unmatched = f(self, unmatched)
-
-        # clean_unmatched() depends on the before_excess methods adding more match slices.
-        cleaned_unmatched = self.clean_unmatched()
-        if cleaned_unmatched:
-            self._part("excess", None, cleaned_unmatched)
+                if profiler is not None:
+                    profiler.record_overlap(option, part_overlaps)
+                if part_overlaps:
+                    continue
 
-        for f in post_processing_after_excess:
-            f(self)
+                # Keys that aren't needed only have to be marked as matched.
+                clean = None
+                if context.needs((key,)):
+                    clean = self.get_clean(context, key, match, option)
+                context._part(key, (match_start, match_end), clean)
+                if key not in compiled_patterns.allow_overlap:
+                    blocking.add(match_start, match_end)
+
+    # Turns a match of one of the key's options into its value.
+    def get_clean(self, context, key, match, option):
+        index = self.get_match_indexes(match)
+
+        if key in ("season", "episode"):
+            clean = self.get_season_episode(match)
+        elif key == "subtitles":
+            clean = self.get_subtitles(match)
+        elif key in ("language", "genre"):
+            clean = self.split_multi(match)
+        elif key in types.keys() and types[key] == "boolean":
+            clean = True
+        else:
+            clean = match[index["clean"]]
+            if key in types.keys() and types[key] == "integer":
+                clean = int(clean)
+
+        if context.standardise:
+            clean = standardiser.standardise(
+                clean, key, option.replace, option.transform
+            )
+        return clean
 
-        return self.parts
+    def find_title(self, context):
+        if not context.needs(("title",)):
+            return
+        context.process_title()
+        context.fix_known_exceptions()
+
+    def run_post_processing_before_excess(self, context):
+        functions = [
+            f
+            for f in post_processing_before_excess
+            if context.needs(post_processing_changes[f])
+        ]
+        if not functions:
+            return
+        unmatched = context.get_unmatched()
+        for f in functions:
+            unmatched = f(context, unmatched)
+
+    # clean_unmatched() depends on the before_excess methods adding more match slices.
+    def add_excess(self, context):
+        if not context.needs(("excess",)):
+            return
+        cleaned_unmatched = context.clean_unmatched()
+        if cleaned_unmatched:
+            context._part("excess", None, cleaned_unmatched)
 
-    # Handles all the optional/missing tuple elements into a consistent list.
-    @staticmethod
-    def normalise_pattern_options(pattern_options):
-        pattern_options_norm = []
-
-        if isinstance(pattern_options, tuple):
-            pattern_options = [pattern_options]
-        elif not isinstance(pattern_options, list):
-            pattern_options = [(pattern_options, None, None)]
-        for options in pattern_options:
-            if len(options) == 2:  # No transformation
-                pattern_options_norm.append(options + (None,))
-            elif isinstance(options, tuple):
-                if isinstance(options[2], tuple):
-                    pattern_options_norm.append(
-                        tuple(list(options[:2]) + [[options[2]]])
-                    )
-                elif isinstance(options[2], list):
-                    pattern_options_norm.append(options)
-                else:
-                    pattern_options_norm.append(
-                        tuple(list(options[:2]) + [[(options[2], [])]])
-                    )
+    def run_post_processing_after_excess(self, context):
+        for f in post_processing_after_excess:
+            if f not in post_processing_changes or context.needs(
+                post_processing_changes[f]
+            ):
+                f(context)
 
-            else:
-                pattern_options_norm.append((options, None, None))
-        pattern_options = pattern_options_norm
-        return pattern_options
+    # Kept for compatibility, patterns are now normalised once in compiled.py.
+    normalise_pattern_options = staticmethod(normalise_pattern_options)
 
-    def get_matches(self, pattern, clean_name, key):
+    # The context, if given, remembers where the key's matches can start between calls.
+    def get_matches(self, pattern, clean_name, key, context=None):
         grouped_matches = []
-        matches = list(re.finditer(pattern, clean_name, re.IGNORECASE))
+        matches = list(pattern.finditer(clean_name))
+        if not matches:
+            return []
+        if context is not None:
+            ignore_before = context.ignore_before_index(key)
+        else:
+            ignore_before = self.ignore_before_index(clean_name, key)
         for m in matches:
-            if m.start() < self.ignore_before_index(clean_name, key):
+            if m.start() < ignore_before:
                 continue
             groups = m.groups()
             if not groups:
@@ -194,19 +238,19 @@ class PTN(object):
         return parsed_matches
 
     # Only use part of the torrent name after the (guessed) title (split at a season or year)
-    # to avoid matching certain patterns that could show up in a release title.
+    # to avoid matching certain patterns that could show up in a release title. Parses
+    # use ParseContext.ignore_before_index instead, which only works this out once per
+    # key.
     def ignore_before_index(self, clean_name, key):
         match = None
         if key in patterns_ignore_title:
             patterns_ignored = patterns_ignore_title[key]
             if not patterns_ignored:
-                match = re.search(self.post_title_pattern, clean_name, re.IGNORECASE)
+                match = self.post_title_pattern.search(clean_name)
             else:
                 for ignore_pattern in patterns_ignored:
                     if re.findall(ignore_pattern, clean_name, re.IGNORECASE):
-                        match = re.search(
-                            self.post_title_pattern, clean_name, re.IGNORECASE
-                        )
+                        match = self.post_title_pattern.search(clean_name)
 
         if match:
             return match.start()
@@ -263,173 +307,20 @@ class PTN(object):
 
         return clean
 
+    # Kept for compatibility, values are now standardised by standardise.py.
     def standardise_clean(self, clean, key, replace, transforms):
-        if replace:
-            clean = replace
-        if transforms:
-            for transform in filter(lambda t: t[0], transforms):
-                # For python2 compatibility, we're not able to simply pass functions as str.upper
-                # means different things in 2.7 and 3.5.
-                clean = getattr(clean, transform[0])(*transform[1])
-        if key == "language" or key == "subtitles":
-            clean = self.standardise_languages(clean)
-            if not clean:
-                clean = "Available"
-        if key == "genre":
-            clean = self.standardise_genres(clean)
-        return clean
-
-    @staticmethod
-    def standardise_languages(clean):
-        cleaned_langs = []
-        for lang in clean:
-            for (lang_regex, lang_clean) in langs:
-                if re.match(
-                    lang_regex,
-                    re.sub(
-                        link_patterns(patterns["subtitles"][-2:]), "", lang, flags=re.I
-                    ),
-                    re.IGNORECASE,
-                ):
-                    cleaned_langs.append(lang_clean)
-                    break
-        clean = cleaned_langs
-        return clean
-
-    @staticmethod
-    def standardise_genres(clean):
-        standard_genres = []
-        for genre in clean:
-            for (regex, clean) in genres:
-                if re.match(regex, genre, re.IGNORECASE):
-                    standard_genres.append(clean)
-                    break
-        return standard_genres
-
-    # Merge all the match slices (such as when they overlap), then remove
-    # them from excess.
-    def merge_match_slices(self):
-        matches = sorted(self.match_slices, key=lambda match: match[0])
-
-        i = 0
-        slices = []
-        while i < len(matches):
-            start, end = matches[i]
-            i += 1
-            for (next_start, next_end) in matches[i:]:
-                if next_start <= end:
-                    end = max(end, next_end)
-                    i += 1
-                else:
-                    break
-            slices.append((start, end))
-
-        self.match_slices = slices
-
-    def process_title(self):
-        unmatched = self.unmatched_list(keep_punctuation=False)
-
-        # Use the first one as the title
-        if unmatched:
-            title_start, title_end = unmatched[0][0], unmatched[0][1]
+        return standardiser.standardise(
+            clean, key, replace, compile_transforms(transforms)
+        )
 
-            # If our unmatched is after the first 3 matches, we assume the title is missing
-            # (or more likely got parsed as something else), as no torrents have it that
-            # far away from the beginning of the release title.
-            if (
-                len(self.part_slices) > 3
-                and title_start
-                > sorted(self.part_slices.values(), key=lambda s: s[0])[3][0]
-            ):
-                self._part("title", None, "")
-
-            raw = self.torrent_name[title_start:title_end]
-            # Something in square brackets with 3 chars or fewer is too weird to be right.
-            # If this seems too arbitrary, make it any square bracket, and Mother test
-            # case will lose its translated title (which is mostly fine I think).
-            m = re.search(r"\(|(?:\[(?:.{,3}\]|[^\]]*\d[^\]]*\]?))", raw, flags=re.I)
-            if m:
-                relative_title_end = m.start()
-                raw = raw[:relative_title_end]
-                title_end = relative_title_end + title_start
-            # Similar logic as above, but looking at beginning of string unmatched brackets.
-            m = re.search(r"^(?:\)|\[.*\])", raw)
-            if m:
-                relative_title_start = m.end()
-                raw = raw[relative_title_start:]
-                title_start = relative_title_start + title_start
-            clean = self._clean_string(raw)
-            # Re-add title_start to unrelative the index from raw to self.torrent_name
-            self._part("title", (title_start, title_end), clean)
-        else:
-            self._part("title", None, "")
-
-    def unmatched_list(self, keep_punctuation=True):
-        self.merge_match_slices()
-        unmatched = []
-        prev_start = 0
-        # A default so the last append won't crash if nothing has matched
-        end = len(self.torrent_name)
-        # Find all unmatched strings that aren't just punctuation
-        for (start, end) in self.match_slices:
-            if keep_punctuation or not re.match(
-                delimiters + r"*\Z", self.torrent_name[prev_start:start]
-            ):
-                unmatched.append((prev_start, start))
-            prev_start = end
-
-        # Add the last unmatched slice
-        if keep_punctuation or not re.match(
-            delimiters + r"*\Z", self.torrent_name[end:]
-        ):
-            unmatched.append((end, len(self.torrent_name)))
-
-        # If nothing matched, assume the whole thing is the title
-        if not self.match_slices:
-            unmatched.append((0, len(self.torrent_name)))
-
-        return unmatched
-
-    def fix_known_exceptions(self):
-        # Considerations for results that are known to cause issues, such
-        # as media with years in them but without a release year.
-        for exception in exceptions:
-            incorrect_key, incorrect_value = exception["incorrect_parse"]
-            if (
-                self.parts["title"] == exception["parsed_title"]
-                and incorrect_key in self.parts
-            ):
-                if self.parts[incorrect_key] == incorrect_value or (
-                    self.coherent_types and incorrect_value in self.parts[incorrect_key]
-                ):
-                    self.parts.pop(incorrect_key)
-                    self._part("title", None, exception["actual_title"], overwrite=True)
-
-    def get_unmatched(self):
-        unmatched = ""
-        for (start, end) in self.unmatched_list():
-            unmatched += self.torrent_name[start:end]
-
-        return unmatched
-
-    def clean_unmatched(self):
-        unmatched = []
-        for (start, end) in self.unmatched_list():
-            unmatched.append(self.torrent_name[start:end])
-
-        unmatched_clean = []
-        for raw in unmatched:
-            clean = re.sub(r"(^[-_.\s(),]+)|([-.\s,]+$)", "", raw)
-            clean = re.sub(r"[()/]", " ", clean)
-            unmatched_clean += re.split(r"\.\.+|\s+", clean)
-
-        filtered = []
-        for extra in unmatched_clean:
-            # re.fullmatch() is not available in python 2.7, so we manually do it with \Z.
-            if not re.match(
-                r"(?:Complete|Season|Full)?[\]\[,.+\- ]*(?:Complete|Season|Full)?\Z",
-                extra,
-                re.IGNORECASE,
-            ):
-                filtered.append(extra)
-        return filtered
+    standardise_languages = staticmethod(standardiser.standardise_languages)
+    standardise_genres = staticmethod(standardiser.standardise_genres)
+
+    # The stages of a parse, in order, with names so they can be timed separately.
+    stages = (
+        ("patterns", match_patterns),
+        ("process_title", find_title),
+        ("post_processing_before_excess", run_post_processing_before_excess),
+        ("clean_unmatched", add_excess),
+        ("post_processing_after_excess", run_post_processing_after_excess),
+    )
@@ -24,7 +24,9 @@ season_range_pattern = (
     + delimiters
     + "*(?:s(?:easons?)?)"
     + delimiters
-    + "*(?:s?[0-9]{1,2}[\s]*(?:(?:\-|(?:\s*to\s*))[\s]*s?[0-9]{1,2}))(?:"
+    # Not "[\s]*(?:\-|\s*to\s*)[\s]*", whose neighbouring \s* take quadratic time to
+    # fail on a long run of spaces (see backtracking.py).
+    + "*(?:s?[0-9]{1,2}[\s]*(?:(?:\-|to)[\s]*s?[0-9]{1,2}))(?:"
     + delimiters
     + "*Complete)?"
 )
@@ -4,11 +4,12 @@
 
 from . import re
 from .extras import link_patterns, complete_series
-from .patterns import episode_name_pattern, langs, patterns, pre_website_encoder_pattern
+from .patterns import episode_name_pattern, patterns, pre_website_encoder_pattern
+from .standardise import standardiser
 
 # Before excess functions (before we split what was unmatched in the title into a list).
-# They all take in the parse object and what was unmatched, and must return the latter minus
-# what they used.
+# They all take in the parse context (see context.py) and what was unmatched, and must
+# return the latter minus what they used.
 
 
 # Try and find the episode name.
@@ -102,7 +103,7 @@ post_processing_before_excess = [
 ]
 
 
-# After excess functions take in just the parse object, and shouldn't return anything.
+# After excess functions take in just the parse context, and shouldn't return anything.
 
 
 # encoder is assumed to be the last element of `excess`, if not already added.
@@ -179,12 +180,7 @@ def filter_non_languages(self):
     if "language" in self.parts and isinstance(self.parts["language"], list):
         languages = list(self.parts["language"])
         for lang in self.parts["language"]:
-            matched = False
-            for (lang_regex, lang_clean) in langs:
-                if re.match(lang_regex, lang, re.IGNORECASE):
-                    matched = True
-                    break
-            if not matched:
+            if not standardiser.is_language(lang):
                 languages.remove(lang)
 
         self._part("language", self.part_slices["language"], languages, overwrite=True)
@@ -238,3 +234,18 @@ post_processing_after_excess = [
     use_year_as_title_if_absent,
     remove_empty_parts,
 ]
+
+# The keys each function can change, so it can be skipped when none of them are needed
+# (see fields.py). Functions not listed always run.
+post_processing_changes = {
+    remove_complete_series_string: ("title",),
+    try_episode_name: ("episodeName", "excess"),
+    try_encoder_before_site: ("encoder", "site", "excess"),
+    try_encoder: ("encoder", "excess"),
+    try_site: ("encoder", "site"),
+    fix_same_subtitles_language_match: ("subtitles",),
+    fix_subtitles_no_language: ("language", "subtitles"),
+    filter_non_languages: ("language",),
+    try_vague_season_episode: ("season", "episode", "title"),
+    use_year_as_title_if_absent: ("title", "year"),
+}
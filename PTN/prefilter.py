@@ -0,0 +1,166 @@
+#!/usr/bin/env python
+
+# Works out which literal strings a regex needs to find a match, so a cheap substring
+# check can rule out pattern options before running them. For example, any match of
+# "([1-9][0-9]{1,2})[\.\s]*fps" has to contain "fps", and "[hx][\.\s]?264" has to
+# contain "264".
+
+try:
+    from re import _parser as sre_parse
+except ImportError:  # Before Python 3.11
+    import sre_parse
+
+# Upper bound on how many strings a run of literals/character classes can expand into
+# before we stop tracking it exactly (e.g. "[hx]264" is {"h264", "x264"}).
+max_expansion = 16
+
+
+class _Requirement(object):
+    __slots__ = ("exact", "required")
+
+    def __init__(self, exact=None, required=None):
+        # Every string this node can match, if it's a small finite set.
+        self.exact = exact
+        # Strings one of which must appear in any match, or None if unknown.
+        self.required = required
+
+    def best_required(self):
+        if self.exact is not None and "" not in self.exact:
+            return pick_required([self.exact, self.required])
+        return self.required
+
+
+# Prefer the set whose shortest string is longest, as it's the least likely to be found.
+def pick_required(candidates):
+    best = None
+    for candidate in candidates:
+        if not candidate or "" in candidate:
+            continue
+        if best is None or min(map(len, candidate)) > min(map(len, best)):
+            best = candidate
+    return best
+
+
+def _literal(code):
+    # Non-ASCII characters have case-insensitive equivalents that .lower() can miss.
+    if code > 127:
+        return None
+    return chr(code).lower()
+
+
+def _char_class(items):
+    chars = set()
+    for op, av in items:
+        if op is sre_parse.LITERAL:
+            char = _literal(av)
+            if char is None:
+                return None
+            chars.add(char)
+        elif op is sre_parse.RANGE and av[1] - av[0] < max_expansion:
+            for code in range(av[0], av[1] + 1):
+                char = _literal(code)
+                if char is None:
+                    return None
+                chars.add(char)
+        else:
+            return None
+    if len(chars) > max_expansion:
+        return None
+    return chars
+
+
+def _node(op, av):
+    if op is sre_parse.LITERAL:
+        char = _literal(av)
+        return _Requirement(exact={char} if char is not None else None)
+    if op is sre_parse.IN:
+        return _Requirement(exact=_char_class(av))
+    if op is sre_parse.AT:
+        return _Requirement(exact={""})
+    if op is sre_parse.SUBPATTERN:
+        return _sequence(av[-1])
+    if op is sre_parse.BRANCH:
+        branches = [_sequence(branch) for branch in av[1]]
+        exact = set()
+        required = set()
+        for branch in branches:
+            if exact is not None:
+                exact = exact | branch.exact if branch.exact is not None else None
+            if required is not None:
+                branch_required = branch.best_required()
+                required = required | branch_required if branch_required else None
+        if exact is not None and len(exact) > max_expansion:
+            exact = None
+        return _Requirement(exact, required)
+    if op in (sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT):
+        minimum, maximum, body = av
+        body = _sequence(body)
+        if minimum == 0:
+            if maximum == 1 and body.exact is not None:
+                return _Requirement(exact=body.exact | {""})
+            return _Requirement()
+        if minimum == maximum == 1:
+            return body
+        return _Requirement(required=body.best_required())
+    # Lookarounds don't consume anything, and everything else (e.g. \d, ., [^x]) can
+    # match too many strings to be worth tracking.
+    if op in (sre_parse.ASSERT, sre_parse.ASSERT_NOT):
+        return _Requirement(exact={""})
+    return _Requirement()
+
+
+def _sequence(items):
+    candidates = []
+    run = {""}  # The strings the current run of consecutive exact nodes can match.
+    exact = True
+    for op, av in items:
+        node = _node(op, av)
+        candidates.append(node.required)
+        if node.exact is not None:
+            extended = set(a + b for a in run for b in node.exact)
+            if len(extended) <= max_expansion:
+                run = extended
+                continue
+        # The run can't be extended past this node, so one of its strings is required,
+        # and a new run starts after it.
+        candidates.append(run)
+        exact = False
+        if node.exact is not None and len(node.exact) <= max_expansion:
+            run = set(node.exact)
+        else:
+            run = {""}
+    candidates.append(run)
+    return _Requirement(run if exact else None, pick_required(candidates))
+
+
+# The lowercase strings one of which must be in a (lowercased) name for `pattern` to
+# match it case-insensitively, or None if no such strings could be worked out.
+def required_literals(pattern):
+    try:
+        parsed = sre_parse.parse(pattern)
+    except Exception:
+        return None
+    required = _sequence(list(parsed)).best_required()
+    if required is None:
+        return None
+    # If "sub" is found, so is "subs": only the shortest strings need to be checked.
+    return tuple(
+        sorted(
+            literal
+            for literal in required
+            if not any(other != literal and other in literal for other in required)
+        )
+    )
+
+
+# The only non-ASCII characters that match ASCII letters case-insensitively in `re`.
+_ascii_case_folds = {0x130: "i", 0x131: "i", 0x17F: "s", 0x212A: "k"}
+
+
+# The text to check required literals against. Byte strings (names on Python 2 that
+# aren't unicode) only match ASCII letters case-insensitively, and can't be translated
+# with a dict.
+def prefilter_text(name):
+    if isinstance(name, bytes):
+        return name.lower()
+    return name.translate(_ascii_case_folds).lower()
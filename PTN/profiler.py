@@ -0,0 +1,142 @@
+#!/usr/bin/env python
+
+# Attributes parsing time to the individual pattern options in patterns.py, to find out
+# which ones are responsible when the parser slows down. Pass a PatternProfiler to
+# PTN.parse (or PTN(profiler=...)), or run it over a corpus with:
+#
+#   python -m PTN.profiler [--corpus names.json] [--top 20]
+
+import argparse
+import sys
+
+from .guard import clock
+from .parse import PTN
+
+
+class PatternStats(object):
+    __slots__ = (
+        "key",
+        "index",
+        "pattern",
+        "time",
+        "calls",
+        "matches",
+        "kept",
+        "discarded",
+    )
+
+    def __init__(self, option):
+        self.key = option.key
+        self.index = option.index
+        self.pattern = option.pattern
+        self.time = 0.0
+        self.calls = 0
+        self.matches = 0
+        self.kept = 0  # The match was used for the key's value.
+        self.discarded = 0  # The match overlapped an existing part, so was dropped.
+
+    def as_dict(self):
+        return dict((name, getattr(self, name)) for name in self.__slots__)
+
+
+# Not thread-safe: use a separate profiler per thread.
+class PatternProfiler(object):
+    clock = staticmethod(clock)
+
+    def __init__(self):
+        self.stats = {}
+
+    def _stats(self, option):
+        stats = self.stats.get((option.key, option.index))
+        if stats is None:
+            stats = self.stats[(option.key, option.index)] = PatternStats(option)
+        return stats
+
+    def record_scan(self, option, elapsed, matches):
+        stats = self._stats(option)
+        stats.time += elapsed
+        stats.calls += 1
+        stats.matches += matches
+
+    def record_overlap(self, option, overlapped):
+        stats = self._stats(option)
+        if overlapped:
+            stats.discarded += 1
+        else:
+            stats.kept += 1
+
+    # The stats for each (key, option index), costliest first.
+    def report(self, top=None):
+        stats = sorted(self.stats.values(), key=lambda s: s.time, reverse=True)
+        return [s.as_dict() for s in stats[:top]]
+
+    # Total time per key, costliest first.
+    def report_keys(self):
+        totals = {}
+        for stats in self.stats.values():
+            totals[stats.key] = totals.get(stats.key, 0.0) + stats.time
+        return sorted(totals.items(), key=lambda item: item[1], reverse=True)
+
+    def format_report(self, top=20):
+        lines = [
+            "{:>10} {:>7} {:>7} {:>6} {:>6}  {}".format(
+                "time (ms)", "calls", "matches", "kept", "disc.", "key[option]"
+            )
+        ]
+        for stats in self.report(top):
+            lines.append(
+                "{:>10.2f} {:>7} {:>7} {:>6} {:>6}  {}[{}] {}".format(
+                    stats["time"] * 1000,
+                    stats["calls"],
+                    stats["matches"],
+                    stats["kept"],
+                    stats["discarded"],
+                    stats["key"],
+                    stats["index"],
+                    stats["pattern"][:60],
+                )
+            )
+        return "\n".join(lines)
+
+    def clear(self):
+        self.stats.clear()
+
+
+# Uses the reference engine by default, so every option is tried (and attributed) for
+# every name, rather than only those the scan engine couldn't rule out.
+def profile_corpus(
+    names, standardise=True, coherent_types=False, profiler=None, engine="reference"
+):
+    if profiler is None:
+        profiler = PatternProfiler()
+    parser = PTN(profiler, engine)
+    for name in names:
+        parser.parse(name, standardise, coherent_types)
+    return profiler
+
+
+def main(argv=None):
+    from .bench import default_corpus, load_corpus
+
+    parser = argparse.ArgumentParser(
+        prog="python -m PTN.profiler",
+        description="Report the costliest pattern options over a corpus.",
+    )
+    parser.add_argument("--corpus", default=default_corpus)
+    parser.add_argument("--top", type=int, default=20)
+    parser.add_argument("--raw", dest="standardise", action="store_false")
+    args = parser.parse_args(argv)
+
+    profiler = profile_corpus(load_corpus(args.corpus), args.standardise)
+    sys.stdout.write(profiler.format_report(args.top) + "\n\n")
+    total = sum(key_time for _, key_time in profiler.report_keys())
+    for key, key_time in profiler.report_keys()[: args.top]:
+        sys.stdout.write(
+            "{:<20}{:>10.2f}ms {:>6.1%}\n".format(
+                key, key_time * 1000, key_time / total
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
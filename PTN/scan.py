@@ -0,0 +1,227 @@
+#!/usr/bin/env python
+
+# Scans a media library: parses the name of every file and folder under a directory,
+# keeping the results in an index so rescans only parse what's new or changed. Each
+# file's result comes with the results of the folders it's in (e.g. a season pack's
+# directory), which are only parsed once however many files they hold.
+
+import json
+import os
+import sqlite3
+import sys
+import threading
+from collections import namedtuple
+
+from .batch import ParseFailure, check_batch_options, parse_many, parse_parallel
+from .cache import fingerprint
+
+
+# `folders` are the parse results of the directories the file is in, below the scanned
+# directory, outermost first.
+class ScanEntry(namedtuple("ScanEntry", ["path", "parsed", "folders"])):
+    __slots__ = ()
+
+    # The file's result, with keys it doesn't have (or an empty title) filled in from
+    # its folders, the closest folder first.
+    def merged(self):
+        parts = {}
+        for folder in self.folders:
+            parts.update(folder)
+        parts.update(self.parsed)
+        if not self.parsed.get("title"):
+            for folder in reversed(self.folders):
+                if folder.get("title"):
+                    parts["title"] = folder["title"]
+                    break
+        return parts
+
+
+# `parsed` and `unchanged` count files and folders, `removed` counts those that were in
+# the index but are gone.
+ScanReport = namedtuple("ScanReport", ["entries", "parsed", "unchanged", "removed"])
+
+
+# The results of previous scans, stored in an SQLite database ("" or ":memory:" for one
+# that only lasts as long as the object). Each path's result is kept with the mtime and
+# inode it had, and is only reused while both stay the same. The index is emptied when
+# PTN or its patterns are updated, or the parse options change.
+class LibraryIndex(object):
+    def __init__(self, path=":memory:"):
+        self.path = path
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._connection:
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)"
+            )
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                "path TEXT PRIMARY KEY, is_dir INTEGER NOT NULL, "
+                "mtime_ns INTEGER NOT NULL, inode INTEGER NOT NULL, "
+                "parts TEXT NOT NULL)"
+            )
+
+    # Empties the index if it was made by another version, or with other options.
+    def check_version(self, standardise, coherent_types):
+        version = "{}:{:d}{:d}".format(
+            fingerprint(), bool(standardise), bool(coherent_types)
+        )
+        with self._lock, self._connection:
+            row = self._connection.execute(
+                "SELECT value FROM meta WHERE key = 'version'"
+            ).fetchone()
+            if row is None or row[0] != version:
+                self._connection.execute("DELETE FROM entries")
+                self._connection.execute(
+                    "INSERT OR REPLACE INTO meta (key, value) VALUES ('version', ?)",
+                    (version,),
+                )
+
+    # {path: (is_dir, mtime_ns, inode, parts)} for the paths in `root` (not including
+    # `root` itself).
+    def load(self, root):
+        prefix = os.path.join(root, "")
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT path, is_dir, mtime_ns, inode, parts FROM entries "
+                "WHERE substr(path, 1, ?) = ?",
+                (len(prefix), prefix),
+            ).fetchall()
+        return dict(
+            (path, (bool(is_dir), mtime_ns, inode, json.loads(parts)))
+            for path, is_dir, mtime_ns, inode, parts in rows
+        )
+
+    # `entries` is {path: (is_dir, mtime_ns, inode, parts)}.
+    def update(self, entries, removed):
+        with self._lock, self._connection:
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO entries (path, is_dir, mtime_ns, inode, parts) "
+                "VALUES (?, ?, ?, ?, ?)",
+                [
+                    (path, int(is_dir), mtime_ns, inode, json.dumps(parts))
+                    for path, (is_dir, mtime_ns, inode, parts) in entries.items()
+                ],
+            )
+            self._connection.executemany(
+                "DELETE FROM entries WHERE path = ?", [(path,) for path in removed]
+            )
+
+    def close(self):
+        self._connection.close()
+
+    def __len__(self):
+        with self._lock:
+            row = self._connection.execute("SELECT COUNT(*) FROM entries").fetchone()
+        return row[0]
+
+
+# (path, name, is_dir, mtime_ns, inode) for everything under `root`. Symlinks to files
+# are included, but symlinks to directories aren't followed, to avoid loops.
+def walk(root, extensions=None):
+    stack = [root]
+    while stack:
+        directory = stack.pop()
+        try:
+            iterator = os.scandir(directory)
+        except OSError:  # e.g. removed or unreadable since it was listed.
+            continue
+        with iterator:
+            for entry in iterator:
+                try:
+                    is_dir = entry.is_dir(follow_symlinks=False)
+                    if not is_dir:
+                        if not entry.is_file():
+                            continue
+                        if extensions is not None:
+                            extension = os.path.splitext(entry.name)[1].lower()
+                            if extension not in extensions:
+                                continue
+                    stat = entry.stat(follow_symlinks=False)
+                except OSError:
+                    continue
+                yield entry.path, entry.name, is_dir, stat.st_mtime_ns, entry.inode()
+                if is_dir:
+                    stack.append(entry.path)
+
+
+# Parses the names of the files and folders under `root`, reusing the results in
+# `index` (a LibraryIndex) for those whose path, mtime and inode haven't changed. The
+# rest are parsed with parse_parallel, in `workers` processes (or threads, with
+# executor="thread"), or in this process if there are fewer than chunk_size of them or
+# workers is 1. Names that fail to parse are left out, and tried again next time.
+#
+# `extensions` limits which files are included, e.g. {".mkv", ".mp4"}. Returns a
+# ScanReport, whose entries are the ScanEntry for each file, sorted by path.
+def scan_library(
+    root,
+    index=None,
+    standardise=True,
+    coherent_types=False,
+    workers=None,
+    executor="process",
+    chunk_size=500,
+    extensions=None,
+):
+    # walk() needs os.scandir, and the index needs st_mtime_ns.
+    if sys.version_info < (3, 5):
+        raise RuntimeError("scan_library needs Python 3.5 or later")
+    check_batch_options(chunk_size, "record")
+    if index is None:
+        index = LibraryIndex()
+    if extensions is not None:
+        extensions = frozenset(extension.lower() for extension in extensions)
+    root = os.path.abspath(root)
+    index.check_version(standardise, coherent_types)
+    previous = index.load(root)
+
+    current = {}
+    to_parse = []
+    for path, name, is_dir, mtime_ns, inode in walk(root, extensions):
+        old = previous.get(path)
+        if old is not None and old[:3] == (is_dir, mtime_ns, inode):
+            current[path] = old
+        else:
+            to_parse.append((path, name, is_dir, mtime_ns, inode))
+    unchanged = len(current)
+
+    names = [name for _, name, _, _, _ in to_parse]
+    if workers == 1 or len(names) < chunk_size:
+        results = parse_many(names, standardise, coherent_types, chunk_size, "record")
+    else:
+        results = parse_parallel(
+            names,
+            standardise,
+            coherent_types,
+            workers,
+            chunk_size,
+            "record",
+            executor=executor,
+        )
+    changed = {}
+    for (path, _, is_dir, mtime_ns, inode), parts in zip(to_parse, results):
+        if not isinstance(parts, ParseFailure):
+            changed[path] = current[path] = (is_dir, mtime_ns, inode, parts)
+
+    removed = [path for path in previous if path not in current]
+    index.update(changed, removed)
+
+    entries = []
+    for path in sorted(current):
+        is_dir, _, _, parts = current[path]
+        if not is_dir:
+            entries.append(ScanEntry(path, parts, folder_context(path, root, current)))
+    return ScanReport(entries, len(changed), unchanged, len(removed))
+
+
+# The parse results of the directories between `root` and `path`, outermost first.
+def folder_context(path, root, entries):
+    folders = []
+    directory = os.path.dirname(path)
+    while directory != root and len(directory) > len(root):
+        entry = entries.get(directory)
+        if entry is not None:
+            folders.append(entry[3])
+        directory = os.path.dirname(directory)
+    folders.reverse()
+    return tuple(folders)
@@ -0,0 +1,61 @@
+#!/usr/bin/env python
+
+# A set of (start, end) spans of the torrent name, kept sorted and merged as spans are
+# added, so overlap queries are a binary search rather than a scan over every span.
+
+from bisect import bisect_left, bisect_right
+
+
+class SpanSet(object):
+    __slots__ = ("starts", "ends", "closed")
+
+    # Closed spans that touch (e.g. (0, 5) and (5, 8)) are merged, like the matched
+    # parts of a name that are removed from the excess. Open spans are only merged if
+    # they really overlap, and empty open spans are ignored, as they contain nothing.
+    def __init__(self, spans=(), closed=True):
+        self.starts = []
+        self.ends = []
+        self.closed = closed
+        for start, end in spans:
+            self.add(start, end)
+
+    def add(self, start, end):
+        if self.closed:
+            # The spans with end >= start and start <= end.
+            first = bisect_left(self.ends, start)
+            last = bisect_right(self.starts, end)
+        else:
+            if start >= end:
+                return
+            # The spans with end > start and start < end.
+            first = bisect_right(self.ends, start)
+            last = bisect_left(self.starts, end)
+        if first < last:
+            start = min(start, self.starts[first])
+            end = max(end, self.ends[last - 1])
+        self.starts[first:last] = [start]
+        self.ends[first:last] = [end]
+
+    # Whether `point` is strictly inside one of the spans.
+    def strictly_contains(self, point):
+        index = bisect_left(self.starts, point) - 1
+        return index >= 0 and point < self.ends[index]
+
+    # The gaps between the spans, from 0 to `length`.
+    def gaps(self, length):
+        gaps = []
+        prev_end = 0
+        for start, end in zip(self.starts, self.ends):
+            gaps.append((prev_end, start))
+            prev_end = end
+        gaps.append((prev_end, length))
+        return gaps
+
+    def __iter__(self):
+        return zip(self.starts, self.ends)
+
+    def __len__(self):
+        return len(self.starts)
+
+    def __repr__(self):
+        return "SpanSet({!r})".format(list(self))
@@ -0,0 +1,126 @@
+#!/usr/bin/env python
+
+# Turns matched values into their standard forms: replacements and transforms from
+# patterns.py, and the language and genre names from extras.py. The tables are compiled
+# once, and the standard form of each language/genre token is remembered, as the same
+# few tokens come up over and over.
+
+from operator import methodcaller
+
+from . import re
+from .backend import LazyPattern
+from .extras import genres, langs, link_patterns
+from .patterns import patterns
+
+
+# One regex that tries each of a table's (regex, standard name) entries in order, at the
+# start of a token, like calling re.match with each of them in turn would. Which entry
+# matched is given by the match's lastindex.
+class NameTable(object):
+    def __init__(self, table, maxsize=10000):
+        self.names = [name for _, name in table]
+        self.regex = LazyPattern(
+            "(?:{})".format("|".join("({})".format(regex) for regex, _ in table)),
+            re.IGNORECASE,
+        )
+        # The entries' own regexes, if any of them have groups that would throw off
+        # lastindex.
+        self.fallback = None
+        if self.regex.groups != len(table):
+            self.fallback = [
+                (LazyPattern(regex, re.IGNORECASE), name) for regex, name in table
+            ]
+        self.maxsize = maxsize
+        self.cache = {}
+
+    # The standard name for the token, or None if it isn't in the table.
+    def lookup(self, token):
+        try:
+            return self.cache[token]
+        except KeyError:
+            pass
+        name = None
+        if self.fallback is None:
+            m = self.regex.match(token)
+            if m:
+                name = self.names[m.lastindex - 1]
+        else:
+            for regex, standard_name in self.fallback:
+                if regex.match(token):
+                    name = standard_name
+                    break
+        if len(self.cache) >= self.maxsize:
+            self.cache.clear()
+        self.cache[token] = name
+        return name
+
+
+# Composes a pattern option's transforms (see patterns.py) into a single function.
+def compile_transforms(transforms):
+    calls = [
+        methodcaller(transform[0], *transform[1])
+        for transform in transforms or ()
+        if transform[0]
+    ]
+    if not calls:
+        return None
+    if len(calls) == 1:
+        return calls[0]
+
+    def transform(clean):
+        for call in calls:
+            clean = call(clean)
+        return clean
+
+    return transform
+
+
+class Standardiser(object):
+    def __init__(self, langs=langs, genres=genres, maxsize=10000):
+        self.languages = NameTable(langs, maxsize)
+        self.genres = NameTable(genres, maxsize)
+        # Language tokens can have a subtitles string stuck to them, e.g. "EngSubs".
+        self.subs_regex = LazyPattern(
+            link_patterns(patterns["subtitles"][-2:]), re.IGNORECASE
+        )
+        self._language_cache = {}
+        self.maxsize = maxsize
+
+    # `transform` is from compile_transforms().
+    def standardise(self, clean, key, replace, transform):
+        if replace:
+            clean = replace
+        if transform is not None:
+            clean = transform(clean)
+        if key == "language" or key == "subtitles":
+            clean = self.standardise_languages(clean)
+            if not clean:
+                clean = "Available"
+        if key == "genre":
+            clean = self.standardise_genres(clean)
+        return clean
+
+    def language(self, token):
+        try:
+            return self._language_cache[token]
+        except KeyError:
+            pass
+        name = self.languages.lookup(self.subs_regex.sub("", token))
+        if len(self._language_cache) >= self.maxsize:
+            self._language_cache.clear()
+        self._language_cache[token] = name
+        return name
+
+    # Unknown languages/genres are dropped.
+    def standardise_languages(self, clean):
+        return [name for name in map(self.language, clean) if name is not None]
+
+    def standardise_genres(self, clean):
+        return [name for name in map(self.genres.lookup, clean) if name is not None]
+
+    # Whether the token (without any subtitles string removed) is a known language.
+    def is_language(self, token):
+        return self.languages.lookup(token) is not None
+
+
+standardiser = Standardiser()
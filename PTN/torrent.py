@@ -0,0 +1,223 @@
+#!/usr/bin/env python
+
+# Parses the names in .torrent files: the torrent's name and the name of each file in
+# it. The file is memory-mapped and only the parts of its bencoded metadata that hold
+# names are decoded; everything else, like the (large) "pieces" string, is skipped over
+# without being read into memory.
+
+import mmap
+import posixpath
+
+from .batch import ParseFailure, check_batch_options, parse_chunk
+from .parse import PTN
+
+_digits = frozenset(b"0123456789")
+_integer, _list, _dict, _end = b"ilde"
+
+
+# The bytes of the string at `pos`, and the position after it.
+def _string(buf, pos):
+    colon = buf.find(b":", pos)
+    if colon == -1 or buf[pos] not in _digits:
+        raise ValueError("expected a string at {}".format(pos))
+    start = colon + 1
+    end = start + int(buf[pos:colon])
+    if end > len(buf):
+        raise ValueError("string at {} runs past the end".format(pos))
+    return buf[start:end], end
+
+
+# The position after the value at `pos`, without decoding it.
+def _skip(buf, pos):
+    depth = 0
+    size = len(buf)
+    while pos < size:
+        byte = buf[pos]
+        if byte == _list or byte == _dict:
+            depth += 1
+            pos += 1
+            continue
+        if byte == _integer:
+            pos = buf.find(b"e", pos) + 1
+            if not pos:
+                break
+        elif byte == _end and depth:
+            depth -= 1
+            pos += 1
+        elif byte in _digits:
+            colon = buf.find(b":", pos)
+            if colon == -1:
+                break
+            pos = colon + 1 + int(buf[pos:colon])
+        else:
+            raise ValueError("unexpected {!r} at {}".format(chr(byte), pos))
+        if not depth:
+            if pos > size:
+                break
+            return pos
+    raise ValueError("value at {} runs past the end".format(pos))
+
+
+# Walks the dict at `pos`, calling read(key, value_pos) for each item. read() returns
+# the position after the value if it read it, or None to skip it. Returns the position
+# after the dict.
+def _read_dict(buf, pos, read):
+    if buf[pos] != _dict:
+        raise ValueError("expected a dict at {}".format(pos))
+    pos += 1
+    while buf[pos] != _end:
+        key, pos = _string(buf, pos)
+        end = read(key, pos)
+        pos = _skip(buf, pos) if end is None else end
+    return pos + 1
+
+
+# The decoded strings in the list at `pos`, and the position after it.
+def _strings(buf, pos):
+    if buf[pos] != _list:
+        raise ValueError("expected a list at {}".format(pos))
+    strings = []
+    pos += 1
+    while buf[pos] != _end:
+        string, pos = _string(buf, pos)
+        strings.append(string.decode("utf-8", "replace"))
+    return strings, pos + 1
+
+
+# The paths in the "files" list at `pos`, and the position after it. Padding files
+# (BEP 47), which only align the next file to a piece boundary, are left out.
+def _files(buf, pos, paths):
+    if buf[pos] != _list:
+        raise ValueError("expected a list at {}".format(pos))
+    pos += 1
+    while buf[pos] != _end:
+        found = {}
+
+        def read(key, value_pos):
+            if key == b"path" or key == b"path.utf-8":
+                found[key], end = _strings(buf, value_pos)
+                return end
+            if key == b"attr":
+                found[key], end = _string(buf, value_pos)
+                return end
+            return None
+
+        pos = _read_dict(buf, pos, read)
+        if b"p" in found.get(b"attr", b""):
+            continue
+        # Some clients add a "path.utf-8" copy when the original isn't UTF-8.
+        components = found.get(b"path.utf-8", found.get(b"path"))
+        if components is None:
+            raise ValueError("file without a path before {}".format(pos))
+        paths.append("/".join(components))
+    return pos + 1
+
+
+# The file paths in the v2 "file tree" at `pos`: nested dicts of path components, where
+# a file's dict has an empty key. Returns the position after it.
+def _file_tree(buf, pos, prefix, paths):
+    def read(key, value_pos):
+        if not key:
+            paths.append(prefix)
+            return None
+        name = key.decode("utf-8", "replace")
+        if prefix:
+            name = prefix + "/" + name
+        return _file_tree(buf, value_pos, name, paths)
+
+    return _read_dict(buf, pos, read)
+
+
+# The torrent's name and the paths of the files in it (empty for a single-file torrent),
+# from a .torrent file's contents (e.g. bytes or an mmap). Each value is read in a
+# single pass, and anything that isn't needed is skipped. Raises ValueError if the
+# contents aren't valid.
+def read_names(buf):
+    try:
+        return _read_names(buf)
+    except IndexError:
+        raise ValueError("unexpected end of data")
+
+
+def _read_names(buf):
+    names = {}
+    paths = []
+    tree_paths = []
+
+    def read_info(key, pos):
+        if key == b"name" or key == b"name.utf-8":
+            names[key], end = _string(buf, pos)
+            return end
+        if key == b"files":
+            return _files(buf, pos, paths)
+        if key == b"file tree":
+            return _file_tree(buf, pos, "", tree_paths)
+        return None
+
+    def read_top(key, pos):
+        if key == b"info":
+            names[key] = True
+            return _read_dict(buf, pos, read_info)
+        return None
+
+    _read_dict(buf, 0, read_top)
+    if b"info" not in names:
+        raise ValueError("no info dict")
+    name = names.get(b"name.utf-8", names.get(b"name"))
+    if name is None:
+        raise ValueError("no name in the info dict")
+    name = name.decode("utf-8", "replace")
+    # Hybrid torrents have both; a single-file v2 torrent's tree is just the file.
+    if not paths and tree_paths != [name]:
+        paths = tree_paths
+    return name, paths
+
+
+def read_torrent(path):
+    with open(path, "rb") as torrent_file:
+        try:
+            buf = mmap.mmap(torrent_file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:  # Empty files can't be mapped.
+            raise ValueError("{} is not a .torrent file: it's empty".format(path))
+        try:
+            return read_names(buf)
+        except ValueError as e:
+            raise ValueError("{} is not a .torrent file: {}".format(path, e))
+        finally:
+            buf.close()
+
+
+# Parses the torrent's name and the name of each of its files, as one batch. Each file
+# is parsed by its name only, as the directories it's in are usually the torrent's name.
+def parse_torrent(path, standardise=True, coherent_types=False, parser=None):
+    name, paths = read_torrent(path)
+    names = [name] + [posixpath.basename(file_path) for file_path in paths]
+    results = parse_chunk(parser or PTN(), names, standardise, coherent_types, "raise")
+    return {
+        "torrent": path,
+        "name": name,
+        "parsed": results[0],
+        "files": [
+            {"path": file_path, "parsed": result}
+            for file_path, result in zip(paths, results[1:])
+        ],
+    }
+
+
+# Returns a generator of parse_torrent's results for each path, sharing one parser.
+# Torrents that can't be read or parsed are handled as `errors` says (see batch.py).
+def parse_torrents(paths, standardise=True, coherent_types=False, errors="raise"):
+    check_batch_options(1, errors)
+    return _parse_torrents(paths, standardise, coherent_types, errors)
+
+
+def _parse_torrents(paths, standardise, coherent_types, errors):
+    parser = PTN()
+    for path in paths:
+        try:
+            yield parse_torrent(path, standardise, coherent_types, parser)
+        except Exception as e:
+            if errors == "raise":
+                raise
+            if errors == "record":
+                yield ParseFailure(path, e)
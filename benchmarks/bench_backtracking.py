@@ -0,0 +1,16 @@
+#!/usr/bin/env python
+
+# Times PTN.parse on worst-case names for every regex `python -m PTN.backtracking`
+# flags, at 256 and 2048 characters, and exits with 1 if any of them slows down
+# super-linearly. It depends on timings, so it isn't part of the tests.
+# Run from the repository root: python benchmarks/bench_backtracking.py
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from PTN.backtracking import main
+
+if __name__ == "__main__":
+    sys.exit(main(["--lengths", "256,2048"] + sys.argv[1:]))
@@ -0,0 +1,66 @@
+#!/usr/bin/env python
+
+# Measures PTN's cold start in fresh interpreters: how long importing it takes, the
+# memory allocated while importing, and how long the first parse and warmup() take.
+# Run from the repository root: python benchmarks/bench_import.py
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+TIMING_CODE = """
+import json, time
+start = time.perf_counter()
+import PTN
+imported = time.perf_counter()
+PTN.parse("The.Walking.Dead.S05E03.720p.HDTV.x264-ASAP[ettv]")
+parsed = time.perf_counter()
+PTN.warmup()
+warm = time.perf_counter()
+print(json.dumps({
+    "import_ms": 1000 * (imported - start),
+    "first_parse_ms": 1000 * (parsed - imported),
+    "warmup_ms": 1000 * (warm - parsed),
+}))
+"""
+
+# Measured separately, as tracing allocations slows the import down.
+MEMORY_CODE = """
+import json, tracemalloc
+tracemalloc.start()
+import PTN
+print(json.dumps({"import_memory_kib": tracemalloc.get_traced_memory()[0] / 1024.0}))
+"""
+
+
+def run(code):
+    output = subprocess.check_output([sys.executable, "-c", code], cwd=ROOT)
+    return json.loads(output.decode("utf-8"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure PTN's cold start.")
+    parser.add_argument("--repeat", type=int, default=5, help="number of interpreters")
+    args = parser.parse_args()
+
+    runs = []
+    for _ in range(args.repeat):
+        results = run(TIMING_CODE)
+        results.update(run(MEMORY_CODE))
+        runs.append(results)
+
+    for measure in runs[0]:
+        values = sorted(run[measure] for run in runs)
+        print(
+            "{:<20} median {:>8.1f}, min {:>8.1f}, max {:>8.1f}".format(
+                measure, values[len(values) // 2], values[0], values[-1]
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
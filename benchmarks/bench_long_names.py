@@ -0,0 +1,62 @@
+#!/usr/bin/env python
+
+# Times PTN.parse on long names (300+ characters), made by padding the names in
+# tests/files/input.json with tags that many patterns match, the way names scraped
+# from some sites look.
+# Run from the repository root: python benchmarks/bench_long_names.py
+
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import PTN
+
+INPUT_PATH = os.path.join(
+    os.path.dirname(__file__), "..", "tests", "files", "input.json"
+)
+
+PADDING = (
+    "Eng.Ita.Fre.Ger.Multi.Subs.AAC.5.1.DTS.HDR.10bit.x265.HEVC.WEB-DL.1080p.REPACK."
+    "PROPER.LiNE.Hallmark.Limited.Extended.Internal.Remastered.Uncut.Dual.Audio."
+)
+
+
+def make_long_names(names, min_length):
+    long_names = []
+    for name in names:
+        long_name = name
+        while len(long_name) < min_length:
+            long_name += "." + PADDING
+        long_names.append(long_name)
+    return long_names
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time PTN.parse on long names.")
+    parser.add_argument("--min-length", type=int, default=300)
+    parser.add_argument("--repeat", type=int, default=3, help="number of timed runs")
+    args = parser.parse_args()
+
+    with open(INPUT_PATH) as input_file:
+        names = make_long_names(json.load(input_file), args.min_length)
+
+    best = None
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        for name in names:
+            PTN.parse(name)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    print(
+        "{} names of {}+ characters: {:.3f}ms per name (best of {})".format(
+            len(names), args.min_length, 1000 * best / len(names), args.repeat
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
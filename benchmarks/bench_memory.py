@@ -0,0 +1,58 @@
+#!/usr/bin/env python
+
+# Compares the memory used by holding parse results as dicts and as CompactResults, over
+# the names in tests/files/input.json repeated to make a larger corpus.
+# Run from the repository root: python benchmarks/bench_memory.py
+
+import argparse
+import gc
+import json
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import PTN
+
+INPUT_PATH = os.path.join(
+    os.path.dirname(__file__), "..", "tests", "files", "input.json"
+)
+
+
+def measure(names, standardise, compact):
+    gc.collect()
+    tracemalloc.start()
+    try:
+        results = list(PTN.parse_many(names, standardise, compact=compact))
+        gc.collect()
+        return len(results), tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure the memory of parse results.")
+    parser.add_argument(
+        "--copies", type=int, default=20, help="times to repeat the corpus"
+    )
+    parser.add_argument("--raw", dest="standardise", action="store_false")
+    args = parser.parse_args()
+
+    with open(INPUT_PATH) as input_file:
+        names = json.load(input_file) * args.copies
+
+    sizes = {}
+    for compact in (False, True):
+        count, size = measure(names, args.standardise, compact)
+        sizes[compact] = size
+        print(
+            "{:<8} {:>10.1f}KiB for {} results ({:.0f} bytes each)".format(
+                "compact:" if compact else "dicts:", size / 1024.0, count, size / count
+            )
+        )
+    print("compact results use {:.0%} of the memory".format(sizes[True] / sizes[False]))
+
+
+if __name__ == "__main__":
+    main()
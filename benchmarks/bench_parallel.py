@@ -0,0 +1,53 @@
+#!/usr/bin/env python
+
+# Times PTN.parse_parallel with 1, 2, 4 and 8 workers, over the names in
+# tests/files/input.json repeated to make a larger corpus.
+# Run from the repository root: python benchmarks/bench_parallel.py
+
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import PTN
+
+INPUT_PATH = os.path.join(
+    os.path.dirname(__file__), "..", "tests", "files", "input.json"
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time PTN.parse_parallel scaling.")
+    parser.add_argument(
+        "--copies", type=int, default=50, help="times to repeat the corpus"
+    )
+    parser.add_argument("--chunk-size", type=int, default=500)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    args = parser.parse_args()
+
+    with open(INPUT_PATH) as input_file:
+        names = json.load(input_file) * args.copies
+
+    start = time.perf_counter()
+    for _ in PTN.parse_many(names):
+        pass
+    serial = time.perf_counter() - start
+    print("serial:    {:.2f}s ({:.0f} names/s)".format(serial, len(names) / serial))
+
+    for workers in args.workers:
+        start = time.perf_counter()
+        for _ in PTN.parse_parallel(names, workers=workers, chunk_size=args.chunk_size):
+            pass
+        elapsed = time.perf_counter() - start
+        print(
+            "{} worker(s): {:.2f}s ({:.0f} names/s, {:.2f}x serial)".format(
+                workers, elapsed, len(names) / elapsed, serial / elapsed
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
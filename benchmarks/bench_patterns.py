@@ -0,0 +1,44 @@
+#!/usr/bin/env python
+
+# Times PTN.parse over the names in tests/files/input.json.
+# Run from the repository root: python benchmarks/bench_patterns.py
+
+import argparse
+import json
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import PTN
+
+INPUT_PATH = os.path.join(
+    os.path.dirname(__file__), "..", "tests", "files", "input.json"
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time PTN.parse over the test corpus.")
+    parser.add_argument("--repeat", type=int, default=5, help="number of timed runs")
+    parser.add_argument("--raw", dest="standardise", action="store_false")
+    args = parser.parse_args()
+
+    with open(INPUT_PATH) as input_file:
+        names = json.load(input_file)
+
+    def run():
+        for name in names:
+            PTN.parse(name, standardise=args.standardise)
+
+    run()  # Warm up, so the first timed run isn't paying for imports.
+    best = min(timeit.repeat(run, number=1, repeat=args.repeat))
+    print(
+        "{} names, best of {}: {:.3f}s ({:.0f} names/s, {:.3f}ms/name)".format(
+            len(names), args.repeat, best, len(names) / best, best * 1000 / len(names)
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
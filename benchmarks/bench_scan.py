@@ -0,0 +1,80 @@
+#!/usr/bin/env python
+
+# Times PTN.scan_library over a generated library of season-pack folders, named after
+# the names in tests/files/input.json: a first scan, a rescan with nothing changed, and
+# a rescan after adding 1% more files.
+# Run from the repository root: python benchmarks/bench_scan.py
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import PTN
+
+INPUT_PATH = os.path.join(
+    os.path.dirname(__file__), "..", "tests", "files", "input.json"
+)
+
+
+def make_library(root, names, files, per_folder):
+    for i in range(files):
+        folder_number = i // per_folder
+        folder = os.path.join(
+            root,
+            "{} ({})".format(
+                names[folder_number % len(names)].replace("/", "-"), folder_number
+            ),
+        )
+        if i % per_folder == 0:
+            os.mkdir(folder)
+        file_name = "Episode {}.mkv".format(i % per_folder + 1)
+        open(os.path.join(folder, file_name), "w").close()
+
+
+def timed_scan(label, root, index, workers):
+    start = time.perf_counter()
+    report = PTN.scan_library(root, index, workers=workers)
+    elapsed = time.perf_counter() - start
+    print(
+        "{:<16}{:.2f}s, {} parsed, {} unchanged, {} files".format(
+            label, elapsed, report.parsed, report.unchanged, len(report.entries)
+        )
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time PTN.scan_library rescans.")
+    parser.add_argument("--files", type=int, default=20000)
+    parser.add_argument("--per-folder", type=int, default=10)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    with open(INPUT_PATH) as input_file:
+        names = json.load(input_file)
+    directory = tempfile.mkdtemp()
+    try:
+        root = os.path.join(directory, "library")
+        os.mkdir(root)
+        make_library(root, names, args.files, args.per_folder)
+        index = PTN.LibraryIndex(os.path.join(directory, "index.sqlite"))
+
+        timed_scan("first scan", root, index, args.workers)
+        timed_scan("rescan", root, index, args.workers)
+        added = os.path.join(root, "added")
+        os.mkdir(added)
+        for i in range(args.files // 100):
+            file_name = "Show.S01E{:02d}.{}.mkv".format(i % 100, i)
+            open(os.path.join(added, file_name), "w").close()
+        timed_scan("1% added", root, index, args.workers)
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    main()
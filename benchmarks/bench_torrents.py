@@ -0,0 +1,159 @@
+#!/usr/bin/env python
+
+# Times PTN.parse_torrents over a directory of generated .torrent files, named after
+# the names in tests/files/input.json, each with a few files and a realistic "pieces"
+# string. Also times just reading the names out of the files, against decoding each
+# whole file into Python objects.
+# Run from the repository root: python benchmarks/bench_torrents.py
+
+import argparse
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import PTN
+from PTN.torrent import read_torrent
+
+INPUT_PATH = os.path.join(
+    os.path.dirname(__file__), "..", "tests", "files", "input.json"
+)
+
+
+def bencode(value):
+    if isinstance(value, int):
+        return b"i" + str(value).encode() + b"e"
+    if isinstance(value, str):
+        value = value.encode("utf-8")
+    if isinstance(value, bytes):
+        return str(len(value)).encode() + b":" + value
+    if isinstance(value, list):
+        return b"l" + b"".join(bencode(item) for item in value) + b"e"
+    return (
+        b"d"
+        + b"".join(bencode(key) + bencode(value[key]) for key in sorted(value))
+        + b"e"
+    )
+
+
+# Decodes everything, like a general-purpose bencode library would.
+def bdecode(data, pos=0):
+    byte = data[pos : pos + 1]
+    if byte == b"i":
+        end = data.index(b"e", pos)
+        return int(data[pos + 1 : end]), end + 1
+    if byte == b"l" or byte == b"d":
+        items = []
+        pos += 1
+        while data[pos : pos + 1] != b"e":
+            item, pos = bdecode(data, pos)
+            items.append(item)
+        if byte == b"l":
+            return items, pos + 1
+        return dict(zip(items[::2], items[1::2])), pos + 1
+    colon = data.index(b":", pos)
+    end = colon + 1 + int(data[pos:colon])
+    return data[colon + 1 : end], end
+
+
+def make_torrents(directory, names, count, pieces, rng):
+    paths = []
+    for i in range(count):
+        name = names[i % len(names)]
+        info = {
+            "name": name,
+            "piece length": 262144,
+            "pieces": os.urandom(20 * pieces),
+        }
+        files = rng.randint(0, 12)
+        if files:
+            info["files"] = [
+                {
+                    "length": rng.randint(1, 10**9),
+                    "path": [name, "{}.E{:02d}.mkv".format(name, n)],
+                }
+                for n in range(files)
+            ]
+        else:
+            info["length"] = rng.randint(1, 10**9)
+        path = os.path.join(directory, "{}.torrent".format(i))
+        with open(path, "wb") as torrent_file:
+            torrent_file.write(
+                bencode({"announce": "http://tracker/announce", "info": info})
+            )
+        paths.append(path)
+    return paths
+
+
+def time_it(function, paths):
+    start = time.perf_counter()
+    for path in paths:
+        function(path)
+    return time.perf_counter() - start
+
+
+# The most memory allocated at once while reading any one of the torrents.
+def peak_memory(function, paths):
+    tracemalloc.start()
+    try:
+        for path in paths:
+            function(path)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time PTN.parse_torrents.")
+    parser.add_argument("--torrents", type=int, default=5000)
+    parser.add_argument("--pieces", type=int, default=2000, help="pieces per torrent")
+    args = parser.parse_args()
+
+    with open(INPUT_PATH) as input_file:
+        names = json.load(input_file)
+    directory = tempfile.mkdtemp()
+    try:
+        paths = make_torrents(
+            directory, names, args.torrents, args.pieces, random.Random(0)
+        )
+        size = sum(os.path.getsize(path) for path in paths) / 1024.0 / 1024.0
+        print("{} torrents, {:.0f}MiB".format(len(paths), size))
+
+        def decode_whole(path):
+            with open(path, "rb") as torrent_file:
+                bdecode(torrent_file.read())
+
+        for label, function in (
+            ("decode whole files", decode_whole),
+            ("read_torrent", read_torrent),
+        ):
+            elapsed = time_it(function, paths)
+            peak = peak_memory(function, paths[:100]) / 1024.0
+            print(
+                "{:<20}{:.2f}s ({:.0f} torrents/s), peak memory {:.0f}KiB".format(
+                    label, elapsed, len(paths) / elapsed, peak
+                )
+            )
+
+        start = time.perf_counter()
+        parsed = 0
+        for result in PTN.parse_torrents(paths):
+            parsed += 1 + len(result["files"])
+        elapsed = time.perf_counter() - start
+        print(
+            "{:<20}{:.2f}s ({:.0f} torrents/s, {:.0f} names/s)".format(
+                "parse_torrents", elapsed, len(paths) / elapsed, parsed / elapsed
+            )
+        )
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    main()
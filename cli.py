@@ -1,12 +1,15 @@
 import argparse
+import io
 import json
+import sys
+import time
 
 import PTN
 
 parser = argparse.ArgumentParser(
     description="Extract media information from torrent-like filename."
 )
-parser.add_argument("torrent", type=str, help="a torrent-like filename")
+parser.add_argument("torrent", type=str, nargs="?", help="a torrent-like filename")
 parser.add_argument(
     "--raw",
     dest="standardise",
@@ -23,10 +26,100 @@ parser.add_argument(
     default=False,
     help="make all non-boolean fields (outside of title and episodeName) into lists.",
 )
+parser.add_argument(
+    "--batch",
+    nargs="*",
+    metavar="FILE",
+    help="parse newline-separated filenames from each FILE (or stdin if none are "
+    "given, or for '-'), printing one JSON object per line.",
+)
+parser.add_argument(
+    "--workers",
+    type=int,
+    default=1,
+    help="number of workers to parse with in batch mode.",
+)
+parser.add_argument(
+    "--executor",
+    choices=PTN.executors,
+    default="process",
+    help="whether multiple workers in batch mode are processes or threads.",
+)
+parser.add_argument(
+    "--unordered",
+    dest="ordered",
+    action="store_false",
+    help="in batch mode with multiple workers, print results as soon as they're "
+    "ready instead of in input order.",
+)
 args = parser.parse_args()
 
-parsed = PTN.parse(
-    args.torrent, standardise=args.standardise, coherent_types=args.coherent_types
-)
 
-print(json.dumps(parsed, indent=2))
+def read_lines(path):
+    if path == "-":
+        for line in sys.stdin:
+            yield line
+    else:
+        with io.open(path, encoding="utf-8") as lines:
+            for line in lines:
+                yield line
+
+
+# Empty lines are skipped.
+def read_names(paths):
+    for path in paths or ["-"]:
+        for line in read_lines(path):
+            name = line.rstrip("\r\n")
+            if name.strip():
+                yield name
+
+
+def run_batch():
+    names = read_names(args.batch)
+    if args.workers > 1:
+        results = PTN.parse_parallel(
+            names,
+            standardise=args.standardise,
+            coherent_types=args.coherent_types,
+            workers=args.workers,
+            errors="record",
+            ordered=args.ordered,
+            executor=args.executor,
+        )
+    else:
+        results = PTN.parse_many(
+            names,
+            standardise=args.standardise,
+            coherent_types=args.coherent_types,
+            errors="record",
+        )
+
+    count = errors = 0
+    start = time.time()
+    for result in results:
+        count += 1
+        if isinstance(result, PTN.ParseFailure):
+            errors += 1
+            result = {"name": result.name, "error": repr(result.error)}
+        sys.stdout.write(json.dumps(result, separators=(",", ":")) + "\n")
+    elapsed = time.time() - start
+
+    sys.stderr.write(
+        "Parsed {} names in {:.2f}s ({:.0f} names/s), {} errors\n".format(
+            count, elapsed, count / elapsed if elapsed else 0, errors
+        )
+    )
+
+
+if args.batch is not None:
+    if args.torrent is not None:
+        parser.error("a torrent can't be given with --batch, pass it in a file instead")
+    run_batch()
+else:
+    if args.torrent is None:
+        parser.error("a torrent is required, unless using --batch")
+    parsed = PTN.parse(
+        args.torrent, standardise=args.standardise, coherent_types=args.coherent_types
+    )
+
+    print(json.dumps(parsed, indent=2))
@@ -0,0 +1,553 @@
+#!/usr/bin/env python
+
+import asyncio
+import json
+import os
+
+import PTN
+import pytest
+
+
+def get_names():
+    json_input = os.path.join(os.path.dirname(__file__), "files/input.json")
+    with open(json_input) as input_file:
+        return json.load(input_file)
+
+
+class TestParseMany:
+    def test_matches_parse(self):
+        names = get_names()
+        expected = [PTN.parse(name) for name in names]
+        assert list(PTN.parse_many(names, chunk_size=7)) == expected
+
+    def test_is_lazy(self):
+        consumed = []
+
+        def names():
+            for name in get_names():
+                consumed.append(name)
+                yield name
+
+        results = PTN.parse_many(names(), chunk_size=3)
+        next(results)
+        assert len(consumed) == 3
+
+    def test_errors(self):
+        names = ["Title.S01E01.720p", None, "Title.2019.1080p"]
+        with pytest.raises(AttributeError):
+            list(PTN.parse_many(names))
+
+        assert len(list(PTN.parse_many(names, errors="skip"))) == 2
+
+        results = list(PTN.parse_many(names, errors="record"))
+        assert isinstance(results[1], PTN.ParseFailure)
+        assert results[1].name is None
+        assert results[2]["year"] == 2019
+
+    def test_bad_options(self):
+        with pytest.raises(ValueError):
+            PTN.parse_many([], errors="ignore")
+        with pytest.raises(ValueError):
+            PTN.parse_many([], chunk_size=0)
+
+
+class TestParseParallel:
+    def test_matches_parse(self):
+        names = get_names()
+        expected = [PTN.parse(name, standardise=False) for name in names]
+        results = PTN.parse_parallel(names, standardise=False, workers=2, chunk_size=25)
+        assert list(results) == expected
+
+    def test_errors(self):
+        names = ["Title.S01E01.720p", None, "Title.2019.1080p"]
+        results = list(
+            PTN.parse_parallel(names, workers=2, chunk_size=1, errors="record")
+        )
+        assert isinstance(results[1], PTN.ParseFailure)
+        assert results[2]["year"] == 2019
+
+    def test_unordered(self):
+        names = get_names()
+        expected = [PTN.parse(name) for name in names]
+        results = PTN.parse_parallel(names, workers=2, chunk_size=10, ordered=False)
+        results = list(results)
+        assert len(results) == len(expected)
+        assert all(result in expected for result in results)
+
+    def test_threads(self):
+        names = get_names()
+        expected = [PTN.parse(name, coherent_types=True) for name in names]
+        results = PTN.parse_parallel(
+            names, coherent_types=True, workers=4, chunk_size=5, executor="thread"
+        )
+        assert list(results) == expected
+
+    def test_shared_parser(self):
+        from concurrent.futures import ThreadPoolExecutor
+
+        names = get_names() * 3
+        expected = [PTN.parse(name) for name in names]
+        parser = PTN.PTN()
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            results = executor.map(lambda name: parser.parse(name, True, False), names)
+            assert list(results) == expected
+
+    def test_worker_compiles_patterns(self, monkeypatch):
+        from PTN import batch
+        from PTN.compiled import compiled_patterns
+
+        monkeypatch.setattr(batch, "_worker_parser", None)
+        monkeypatch.setattr(batch, "_worker_options", None)
+        options = []
+        for _, key_options in compiled_patterns:
+            options.extend(key_options)
+        for option in options:
+            option._generation = None  # As in a freshly started worker.
+        batch._init_worker(True, False, "raise", None, None, PTN.get_regex_backend())
+        assert all(option._generation == PTN.re.generation for option in options)
+
+    def test_worker_set_up_by_first_task(self, monkeypatch):
+        from PTN import batch
+
+        # As in a worker of a pool without an initializer (before Python 3.7).
+        monkeypatch.setattr(batch, "_worker_parser", None)
+        monkeypatch.setattr(batch, "_worker_options", None)
+        setup = (False, False, "raise", None, None, PTN.get_regex_backend())
+        names = get_names()[:5]
+        expected = [PTN.parse(name, standardise=False) for name in names]
+        assert batch._parse_chunk_in_worker(names, setup) == expected
+        assert batch._worker_options == (False, False, "raise")
+
+    def test_bad_options(self):
+        with pytest.raises(ValueError):
+            PTN.parse_parallel([], workers=0)
+        with pytest.raises(ValueError):
+            PTN.parse_parallel([], executor="fiber")
+
+
+class TestAsync:
+    def test_aparse(self):
+        name = "The Walking Dead S05E03 720p HDTV x264-ASAP[ettv]"
+        assert asyncio.run(PTN.aparse(name)) == PTN.parse(name)
+
+    def test_aparse_many(self):
+        names = get_names()
+        expected = [PTN.parse(name, standardise=False) for name in names]
+
+        async def async_names():
+            for name in names:
+                yield name
+
+        async def collect(executor):
+            results = PTN.aparse_many(
+                async_names(), standardise=False, executor=executor, chunk_size=9
+            )
+            return [result async for result in results]
+
+        assert asyncio.run(collect(None)) == expected
+        assert asyncio.run(collect("thread")) == expected
+
+    def test_backpressure(self):
+        consumed = []
+
+        async def async_names():
+            for name in get_names():
+                consumed.append(name)
+                yield name
+
+        async def first():
+            results = PTN.aparse_many(async_names(), chunk_size=2, max_in_flight=3)
+            result = await results.__anext__()
+            await results.aclose()
+            return result
+
+        assert asyncio.run(first()) == PTN.parse(get_names()[0])
+        assert len(consumed) == 6
+
+    def test_cancellation(self):
+        async def endless_names():
+            while True:
+                yield "Title.S01E01.720p"
+                await asyncio.sleep(0)
+
+        async def consume():
+            async for _ in PTN.aparse_many(endless_names()):
+                pass
+
+        async def main():
+            task = asyncio.ensure_future(consume())
+            await asyncio.sleep(0.05)
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+
+        asyncio.run(main())
+
+    def test_bad_options(self):
+        with pytest.raises(ValueError):
+            PTN.aparse_many([], executor="fiber")
+        with pytest.raises(ValueError):
+            PTN.aparse_many([], max_in_flight=0)
+
+
+def bencode(value):
+    if isinstance(value, int):
+        return b"i" + str(value).encode() + b"e"
+    if isinstance(value, str):
+        value = value.encode("utf-8")
+    if isinstance(value, bytes):
+        return str(len(value)).encode() + b":" + value
+    if isinstance(value, list):
+        return b"l" + b"".join(bencode(item) for item in value) + b"e"
+    return b"d" + b"".join(bencode(k) + bencode(value[k]) for k in sorted(value)) + b"e"
+
+
+class TestTorrentFiles:
+    name = "The.Walking.Dead.S05.720p.HDTV.x264-ASAP"
+
+    def write(self, tmp_path, info, file_name="test.torrent"):
+        path = str(tmp_path / file_name)
+        with open(path, "wb") as torrent_file:
+            torrent_file.write(bencode({"announce": "http://tracker", "info": info}))
+        return path
+
+    def test_multi_file(self, tmp_path):
+        files = [
+            {"length": 10, "path": [self.name, "The.Walking.Dead.S05E01.720p.mkv"]},
+            {
+                "length": 1,
+                "path": ["Subs", "bad"],
+                "path.utf-8": ["Subs", "English.srt"],
+            },
+        ]
+        info = {"name": self.name, "pieces": b"e" * 2000, "files": files}
+        result = PTN.parse_torrent(self.write(tmp_path, info))
+        assert result["name"] == self.name
+        assert result["parsed"] == PTN.parse(self.name)
+        assert [f["path"] for f in result["files"]] == [
+            self.name + "/The.Walking.Dead.S05E01.720p.mkv",
+            "Subs/English.srt",
+        ]
+        assert result["files"][0]["parsed"] == PTN.parse(
+            "The.Walking.Dead.S05E01.720p.mkv"
+        )
+        assert result["files"][1]["parsed"] == PTN.parse("English.srt")
+
+    def test_padding_files(self, tmp_path):
+        files = [
+            {"length": 10, "path": ["Show.S01E01.mkv"]},
+            {"attr": "p", "length": 6, "path": [".pad", "6"]},
+            {"attr": "x", "length": 1, "path": ["run.sh"]},
+            {"attr": "hp", "length": 3, "path": [".pad", "3"]},
+        ]
+        info = {"name": "Show.S01", "pieces": b"\x00" * 20, "files": files}
+        result = PTN.parse_torrent(self.write(tmp_path, info))
+        assert [f["path"] for f in result["files"]] == ["Show.S01E01.mkv", "run.sh"]
+
+    def test_single_file(self, tmp_path):
+        info = {"name": self.name + ".mkv", "length": 5, "pieces": b"\x00" * 20}
+        result = PTN.parse_torrent(self.write(tmp_path, info))
+        assert result["files"] == []
+        assert result["parsed"] == PTN.parse(self.name + ".mkv")
+
+    def test_file_tree(self, tmp_path):
+        tree = {"Show.S01E02.mkv": {"": {"length": 1}}, "Subs": {"en.srt": {"": {}}}}
+        info = {"name": "Show.S01", "file tree": tree, "meta version": 2}
+        result = PTN.parse_torrent(self.write(tmp_path, info))
+        paths = [f["path"] for f in result["files"]]
+        assert paths == ["Show.S01E02.mkv", "Subs/en.srt"]
+
+    def test_errors(self, tmp_path):
+        good = self.write(tmp_path, {"name": self.name, "length": 1})
+        truncated = str(tmp_path / "truncated.torrent")
+        with open(good, "rb") as good_file, open(truncated, "wb") as truncated_file:
+            truncated_file.write(good_file.read()[:-5])
+        empty = str(tmp_path / "empty.torrent")
+        open(empty, "w").close()
+        no_info = self.write(tmp_path, {}, "no_info.torrent")
+        for path in (truncated, empty, no_info):
+            with pytest.raises(ValueError):
+                PTN.parse_torrent(path)
+
+        paths = [good, truncated, empty, good]
+        assert len(list(PTN.parse_torrents(paths, errors="skip"))) == 2
+        results = list(PTN.parse_torrents(paths, errors="record"))
+        assert [isinstance(r, PTN.ParseFailure) for r in results] == [
+            False,
+            True,
+            True,
+            False,
+        ]
+        assert results[1].name == truncated
+
+
+class TestScanLibrary:
+    season = "The.Walking.Dead.S05.720p.HDTV.x264-ASAP"
+
+    def make_library(self, root):
+        (root / self.season).mkdir()
+        for name in ("The.Walking.Dead.S05E01.720p.mkv", "Episode 2.mkv"):
+            (root / self.season / name).write_text("")
+        (root / "Vacancy (2007) 720p Bluray Dual Audio.mkv").write_text("")
+        (root / "notes.txt").write_text("")
+
+    def test_scan(self, tmp_path):
+        self.make_library(tmp_path)
+        report = PTN.scan_library(str(tmp_path), extensions=[".MKV"])
+        assert (report.parsed, report.unchanged, report.removed) == (4, 0, 0)
+        paths = [os.path.relpath(entry.path, str(tmp_path)) for entry in report.entries]
+        assert paths == [
+            os.path.join(self.season, "Episode 2.mkv"),
+            os.path.join(self.season, "The.Walking.Dead.S05E01.720p.mkv"),
+            "Vacancy (2007) 720p Bluray Dual Audio.mkv",
+        ]
+        episode, _, movie = report.entries
+        assert episode.parsed == PTN.parse("Episode 2.mkv")
+        assert episode.folders == (PTN.parse(self.season),)
+        merged = episode.merged()
+        assert merged["title"] == "The Walking Dead"
+        assert (merged["season"], merged["episode"]) == (5, 2)
+        assert movie.folders == ()
+
+    def test_rescan(self, tmp_path):
+        library = tmp_path / "library"
+        library.mkdir()
+        self.make_library(library)
+        index_path = str(tmp_path / "index.sqlite")
+        report = PTN.scan_library(str(library), PTN.LibraryIndex(index_path))
+        assert (report.parsed, report.unchanged, report.removed) == (5, 0, 0)
+
+        index = PTN.LibraryIndex(index_path)
+        again = PTN.scan_library(str(library), index)
+        assert (again.parsed, again.unchanged, again.removed) == (0, 5, 0)
+        assert again.entries == report.entries
+
+        (library / "notes.txt").unlink()
+        (library / "Deadliest.Catch.S00E66.720p.mkv").write_text("")
+        movie = library / "Vacancy (2007) 720p Bluray Dual Audio.mkv"
+        os.utime(str(movie), (0, 0))
+        changed = PTN.scan_library(str(library), index)
+        assert (changed.parsed, changed.unchanged, changed.removed) == (2, 3, 1)
+        assert len(index) == 5
+
+        # Different options can't reuse the results.
+        coherent = PTN.scan_library(str(library), index, coherent_types=True)
+        assert coherent.parsed == 5
+
+    def test_workers(self, tmp_path):
+        self.make_library(tmp_path)
+        serial = PTN.scan_library(str(tmp_path))
+        threaded = PTN.scan_library(
+            str(tmp_path), workers=2, executor="thread", chunk_size=1
+        )
+        assert threaded.entries == serial.entries
+
+
+class TestEvaluate:
+    def get_expected(self, kind):
+        json_output = os.path.join(
+            os.path.dirname(__file__), "files/output_{}.json".format(kind)
+        )
+        with open(json_output) as output_file:
+            return json.load(output_file)
+
+    def test_corpus(self):
+        names = get_names()
+        report = PTN.evaluate(
+            names,
+            self.get_expected("raw"),
+            standardise=False,
+            workers=2,
+            executor="thread",
+            chunk_size=50,
+        )
+        assert (report["names"], report["exact"]) == (len(names), len(names))
+        assert report["mismatches"] == []
+        assert report["total"]["precision"] == report["total"]["recall"] == 1.0
+        assert report["fields"]["title"]["true_positives"] == len(names)
+        json.dumps(report)
+
+        # Only some of each name's parts are labelled in output_standard.json.
+        partial = PTN.evaluate(
+            iter(names), iter(self.get_expected("standard")), partial=True, workers=1
+        )
+        assert partial["exact"] == len(names)
+
+    def test_scores(self):
+        name = "The Walking Dead S05E03 720p HDTV x264-ASAP[ettv]"
+        expected = {"title": "The Walking Dead", "season": 6, "episode": 3}
+        report = PTN.evaluate(
+            [name], [expected], ignore=("encoder", "site", "quality"), workers=1
+        )
+        assert (report["exact"], report["mismatched"]) == (0, 1)
+        assert report["mismatches"][0]["diff"] == {
+            "season": {"expected": 6, "got": 5},
+            "resolution": {"got": "720p"},
+            "codec": {"got": "H.264"},
+        }
+        season = report["fields"]["season"]
+        assert (season["precision"], season["recall"]) == (0.0, 0.0)
+        assert report["fields"]["resolution"]["recall"] is None
+        assert report["fields"]["title"]["precision"] == 1.0
+        assert "quality" not in report["fields"]
+        assert "changes" not in report
+
+        with pytest.raises(ValueError):
+            PTN.evaluate([name, name], [expected], workers=1)
+
+    def test_baseline(self):
+        names = get_names()[:20]
+        expected = [PTN.parse(name) for name in names]
+        baseline = [dict(result) for result in expected]
+        baseline[3]["title"] = "Old title"
+        del baseline[5]["title"]
+        report = PTN.evaluate(
+            names, expected, baseline=baseline, workers=1, max_examples=1
+        )
+        assert (report["exact"], report["changed"]) == (20, 2)
+        assert report["changes"] == [
+            {
+                "name": names[3],
+                "diff": {
+                    "title": {"before": "Old title", "after": expected[3]["title"]}
+                },
+            }
+        ]
+
+    def test_main(self, tmp_path, capsys):
+        from PTN.evaluation import main
+
+        names = tmp_path / "names.txt"
+        names.write_text("Vacancy (2007) 720p Bluray\nInsecure.S04.720p\n")
+        expected = tmp_path / "expected.jsonl"
+        expected.write_text(
+            '{"title": "Vacancy", "year": 2007}\n{"title": "Insecure", "season": 4}\n'
+        )
+        output = tmp_path / "report.json"
+        arguments = [str(names), str(expected), "--partial", "--workers", "1"]
+        assert main(arguments + ["--output", str(output)]) == 0
+        with open(str(output)) as report_file:
+            report = json.load(report_file)
+        assert (report["names"], report["exact"]) == (2, 2)
+        assert "2 names, 2 exact" in capsys.readouterr().err
+
+        # Everything that isn't labelled counts against it without --partial.
+        assert main(arguments[:2] + ["--workers", "1"]) == 1
+        assert json.loads(capsys.readouterr().out)["mismatched"] == 2
+
+
+class TestParseCache:
+    def test_hits_and_copies(self):
+        cache = PTN.ParseCache(maxsize=2)
+        name = "Title.S01E01.ITA.ENG.720p"
+        first = cache.parse(name)
+        first["language"].append("Changed")
+        first["title"] = "Changed"
+        second = cache.parse(name)
+        assert second == PTN.parse(name)
+        assert cache.stats()["hits"] == 1
+        assert cache.stats()["misses"] == 1
+
+        # The options are part of the key.
+        assert cache.parse(name, standardise=False) == PTN.parse(
+            name, standardise=False
+        )
+        assert cache.misses == 2
+
+    def test_eviction(self):
+        cache = PTN.ParseCache(maxsize=2)
+        for name in ("a 2019", "b 2019", "a 2019", "c 2019"):
+            cache.parse(name)
+        assert cache.evictions == 1
+        assert len(cache) == 2
+        cache.parse("a 2019")  # Most recently used, so it was kept
+        assert cache.hits == 2
+
+        cache.clear()
+        assert len(cache) == 0
+        assert cache.stats()["hits"] == 0
+
+
+class TestSQLiteParseCache:
+    def test_round_trip(self, tmp_path):
+        path = str(tmp_path / "cache.db")
+        names = get_names()[:50]
+        expected = [PTN.parse(name, coherent_types=True) for name in names]
+
+        cache = PTN.SQLiteParseCache(path)
+        assert cache.parse_many(names, coherent_types=True) == expected
+        assert len(cache) == len(set(names))
+        cache.close()
+
+        cache = PTN.SQLiteParseCache(path)
+        assert cache.get_many([cache.result_key(names[0], True, True)])
+        assert cache.parse_many(names, coherent_types=True) == expected
+        first, second = cache.parse_many([names[0], names[0]], coherent_types=True)
+        assert first == second and first is not second
+        assert cache.parse(names[0], standardise=False) == PTN.parse(
+            names[0], standardise=False
+        )
+        cache.close()
+
+    def test_invalidated_by_fingerprint(self, tmp_path, monkeypatch):
+        path = str(tmp_path / "cache.db")
+        cache = PTN.SQLiteParseCache(path)
+        cache.parse("Title.S01E01.720p")
+        cache.close()
+
+        monkeypatch.setattr(PTN.cache, "_fingerprint", "changed")
+        cache = PTN.SQLiteParseCache(path)
+        assert len(cache) == 0
+        cache.close()
+
+    def test_fingerprint_covers_parse_modules(self, monkeypatch):
+        import pkgutil
+        from PTN.cache import fingerprint, fingerprint_modules
+
+        modules = fingerprint_modules()
+        for name in ("parse", "patterns", "extras", "post", "context", "compiled"):
+            assert name in modules
+        for name in ("standardise", "prefilter", "spans", "fields"):
+            assert name in modules
+
+        # A change to any of them changes the fingerprint.
+        original = fingerprint()
+        get_data = pkgutil.get_data
+
+        def changed_spans(package, resource):
+            data = get_data(package, resource)
+            if resource == "spans.py":
+                data += b"# Changed"
+            return data
+
+        monkeypatch.setattr(PTN.cache, "_fingerprint", None)
+        monkeypatch.setattr(pkgutil, "get_data", changed_spans)
+        assert fingerprint() != original
+
+    def test_prune(self, tmp_path):
+        cache = PTN.SQLiteParseCache(str(tmp_path / "cache.db"))
+        cache.parse_many(get_names()[:20])
+        assert cache.prune(max_entries=5) == 15
+        assert len(cache) == 5
+        assert cache.prune(max_age=-1) == 5
+        cache.close()
+
+    def test_limits_hold_while_filling(self, tmp_path):
+        path = str(tmp_path / "cache.db")
+        names = get_names()[:60]
+        cache = PTN.SQLiteParseCache(path, max_entries=25)
+        for i in range(0, len(names), 10):
+            cache.parse_many(names[i : i + 10])
+            assert len(cache) == min(i + 10, 25)
+        # Storing results that are already there doesn't count them twice.
+        keys = [cache.result_key(name, True, False) for name in names[-10:]]
+        cache.put_many(cache.get_many(keys))
+        assert len(cache) == 25
+        # The newest results are the ones kept.
+        assert len(cache.get_many(keys)) == 10
+        cache.close()
+
+        cache = PTN.SQLiteParseCache(path, max_entries=5, max_age=3600)
+        cache.parse_many(names[:3])
+        assert len(cache) == 5
+        cache.close()
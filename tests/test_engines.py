@@ -0,0 +1,400 @@
+#!/usr/bin/env python
+
+import json
+import os
+import random
+import subprocess
+import sys
+
+import PTN
+import pytest
+from PTN import re
+from PTN.backend import backends, fastest_regex_backend
+from PTN.backtracking import analyse, find_problems, parser_regexes
+from PTN.extras import genres, langs
+from PTN.guard import truncate_name
+from PTN.compact import result_keys
+from PTN.compiled import compiled_patterns
+from PTN.prefilter import prefilter_text, required_literals
+from PTN.profiler import PatternProfiler, profile_corpus
+from PTN.spans import SpanSet
+from PTN.standardise import Standardiser, compile_transforms
+
+
+def get_names():
+    json_input = os.path.join(os.path.dirname(__file__), "files/input.json")
+    with open(json_input) as input_file:
+        return json.load(input_file)
+
+
+class TestPatternProfiler:
+    def test_does_not_change_results(self):
+        names = get_names()
+        profiler = PatternProfiler()
+        for name in names:
+            assert PTN.parse(name, profiler=profiler) == PTN.parse(name)
+
+    def test_report(self):
+        names = get_names()
+        profiler = profile_corpus(names)
+        report = profiler.report()
+        assert report == sorted(report, key=lambda s: s["time"], reverse=True)
+        resolution = profiler.stats[("resolution", 0)]
+        assert resolution.calls == len(names)
+        assert resolution.kept + resolution.discarded <= resolution.matches
+        assert len(profiler.report(top=5)) == 5
+        assert "resolution[0]" in profiler.format_report(top=None)
+
+
+class TestEngines:
+    @pytest.mark.parametrize("engine", ["scan", "combined"])
+    @pytest.mark.parametrize(
+        "standardise,coherent_types", [(False, False), (True, False), (True, True)]
+    )
+    def test_scan_matches_reference(self, engine, standardise, coherent_types):
+        scan = PTN.PTN(engine=engine)
+        reference = PTN.PTN(engine="reference")
+        for name in get_names():
+            assert scan.parse(name, standardise, coherent_types) == reference.parse(
+                name, standardise, coherent_types
+            ), name
+
+    def test_combined_scan(self):
+        name = "The.Walking.Dead.S05E03.720p.HDTV.x264-ASAP"
+        candidates = compiled_patterns.combined_scan("resolution", name)
+        assert 0 < len(candidates) < len(compiled_patterns["resolution"])
+        # Keys with few options are never split up.
+        assert (
+            compiled_patterns.combined_scan("year", name) is compiled_patterns["year"]
+        )
+
+    def test_unknown_engine(self):
+        with pytest.raises(ValueError):
+            PTN.PTN(engine="fast")
+
+
+class TestRegexBackend:
+    @pytest.mark.parametrize("backend", backends)
+    @pytest.mark.parametrize(
+        "standardise,coherent_types", [(False, False), (True, False), (True, True)]
+    )
+    def test_same_results(self, backend, standardise, coherent_types):
+        pytest.importorskip(backend)
+        names = get_names()
+        expected = [PTN.parse(name, standardise, coherent_types) for name in names]
+        current = PTN.get_regex_backend()
+        try:
+            PTN.set_regex_backend(backend)
+            assert PTN.get_regex_backend() == backend
+            for name, result in zip(names, expected):
+                assert PTN.parse(name, standardise, coherent_types) == result, name
+        finally:
+            PTN.set_regex_backend(current)
+
+    def test_workers_use_current_backend(self, monkeypatch):
+        import asyncio
+        import concurrent.futures
+        import multiprocessing
+
+        pytest.importorskip("regex")
+        backends_used = []
+
+        # Spawned workers start with the backend from the environment, not the one set
+        # in this process, unless it's passed on to them.
+        class SpawnPool(concurrent.futures.ProcessPoolExecutor):
+            def __init__(self, **kwargs):
+                kwargs["mp_context"] = multiprocessing.get_context("spawn")
+                super(SpawnPool, self).__init__(**kwargs)
+
+            def submit(self, fn, *args, **kwargs):
+                future = super(SpawnPool, self).submit(fn, *args, **kwargs)
+                future.result()
+                backend = super(SpawnPool, self).submit(PTN.get_regex_backend)
+                backends_used.append(backend.result())
+                return future
+
+        monkeypatch.setenv("PTN_REGEX_BACKEND", "re")
+        monkeypatch.setattr(concurrent.futures, "ProcessPoolExecutor", SpawnPool)
+        name = get_names()[0]
+        current = PTN.get_regex_backend()
+        try:
+            PTN.set_regex_backend("regex")
+            results = PTN.parse_parallel([name], workers=1)
+            assert list(results) == [PTN.parse(name)]
+            with SpawnPool(max_workers=1) as pool:
+                assert asyncio.run(PTN.aparse(name, executor=pool)) == PTN.parse(name)
+        finally:
+            PTN.set_regex_backend(current)
+        assert backends_used == ["regex", "regex"]
+
+    def test_unknown_backend(self):
+        with pytest.raises(ValueError):
+            PTN.set_regex_backend("pcre")
+        assert PTN.get_regex_backend() in backends
+
+    def test_fastest(self):
+        assert fastest_regex_backend(repeat=1) in PTN.available_regex_backends()
+
+    def test_environment_variable(self):
+        code = "import PTN\nprint(PTN.get_regex_backend())\n"
+        root = os.path.join(os.path.dirname(__file__), "..")
+        env = dict(os.environ, PTN_REGEX_BACKEND="auto")
+        output = subprocess.check_output(
+            [sys.executable, "-c", code], cwd=root, env=env
+        )
+        assert output.decode().strip() in PTN.available_regex_backends()
+
+
+class TestLimits:
+    name = "The.Walking.Dead.S05E03.720p.HDTV.x264-ASAP[ettv]"
+
+    def test_truncate_name(self):
+        assert truncate_name("The.Walking.Dead", 20) == "The.Walking.Dead"
+        assert truncate_name("The.Walking.Dead", 12) == "The.Walking"
+        assert truncate_name("The.Walking.Dead", 11) == "The.Walking"
+        assert truncate_name("The.Walking.Dead", 9) == "The"
+        assert truncate_name("TheWalkingDead", 5) == "TheWa"
+
+    def test_max_length(self):
+        PTN.reset_guard_counters()
+        parts = PTN.parse(self.name, max_length=27)
+        # "720p" would be cut in two, so is left out.
+        assert parts == dict(PTN.parse(self.name[:23]), truncated=True)
+        assert PTN.parse(self.name, max_length=len(self.name)) == PTN.parse(self.name)
+        assert PTN.guard_counters() == {"parsed": 2, "truncated": 1, "degraded": 0}
+
+    def test_time_budget(self):
+        PTN.reset_guard_counters()
+        parts = PTN.parse(self.name, time_budget=1e-9)
+        assert parts["degraded"] is True
+        assert "title" in parts and "excess" not in parts
+        assert PTN.parse(self.name, time_budget=60) == PTN.parse(self.name)
+        assert PTN.guard_counters() == {"parsed": 2, "truncated": 0, "degraded": 1}
+
+    def test_fields(self):
+        parts = PTN.parse(self.name, fields=["season"], time_budget=1e-9, max_length=3)
+        assert parts == {"truncated": True, "degraded": True}
+
+    def test_batch(self):
+        results = list(PTN.parse_many([self.name] * 3, max_length=27, compact=True))
+        assert [result["truncated"] for result in results] == [True] * 3
+        results = PTN.parse_parallel([self.name], max_length=27, executor="thread")
+        assert next(results)["truncated"] is True
+
+    def test_bad_limits(self):
+        with pytest.raises(ValueError):
+            PTN.PTN(time_budget=0)
+        with pytest.raises(ValueError):
+            PTN.parse(self.name, max_length=0)
+        with pytest.raises(ValueError):
+            PTN.parse_parallel([self.name], time_budget=-1)
+
+
+class TestBacktracking:
+    @staticmethod
+    def kinds(pattern):
+        return sorted(finding.kind for finding in analyse("test", pattern))
+
+    def test_analyse(self):
+        assert self.kinds(r"(?:\s+\w*)+x") == ["nested"]
+        assert self.kinds(r"a\s*[\s.]*x") == ["adjacent"]
+        assert self.kinds(r"(?:\wb|\dc)+x") == ["branches"]
+        assert self.kinds(r"\d+x\s*(?=y)") == []
+        assert self.kinds(r"\d+[a-z]+") == []
+
+    def test_worst_case_name(self):
+        (finding,) = analyse("test", r"S\d\s*[\s.]*x")
+        name = finding.name(64)
+        assert name.startswith("S0 ") and name.endswith("!") and len(name) == 65
+        assert re.match(r"S\d\s*[\s.]*x", name) is None
+
+    def test_parser_regexes(self):
+        labels = [label for label, _ in parser_regexes()]
+        assert "resolution[0]" in labels and "langs[0]" in labels
+        assert any(label.startswith("post:") for label in labels)
+        assert any(label.startswith("parse:") for label in labels)
+
+    # Only the analysis: timing the findings (see benchmarks/bench_backtracking.py)
+    # depends on the machine, so isn't done here.
+    def test_find_problems(self):
+        labels = set(label for label, _ in parser_regexes())
+        findings = find_problems()
+        assert findings
+        for finding in findings:
+            assert finding.label in labels
+            assert finding.kind in ("nested", "adjacent", "branches")
+            assert finding.timings == []
+            name = finding.name(256)
+            assert name.startswith(finding.prefix)
+            assert abs(len(name) - 256) <= len(finding.pump) + 1, finding
+
+
+class TestParseContext:
+    def test_ignore_before_index(self):
+        parser = PTN.PTN()
+        for name in get_names() + ["Show LiNE 2019 720p", "Hallmark S01E01"]:
+            context = parser.start(name, True, False)
+            for key, _ in compiled_patterns:
+                expected = parser.ignore_before_index(context.clean_name, key)
+                assert context.ignore_before_index(key) == expected, (name, key)
+                # And again, now that it's been worked out.
+                assert context.ignore_before_index(key) == expected, (name, key)
+
+    def test_long_names(self):
+        names = [
+            name + ".Eng.Ita.Multi.Subs.AAC.5.1.x265.1080p.REPACK.LiNE.Limited" * 6
+            for name in get_names()[:100]
+        ]
+        reference = PTN.PTN(engine="reference")
+        for name in names:
+            assert len(name) > 300
+            assert PTN.parse(name) == reference.parse(name, True, False)
+
+
+class TestSpanSet:
+    @staticmethod
+    def merged(spans):
+        merged = []
+        for start, end in sorted(spans):
+            if merged and start <= merged[-1][1]:
+                merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+            else:
+                merged.append((start, end))
+        return merged
+
+    def test_matches_naive(self):
+        rng = random.Random(0)
+        for _ in range(500):
+            spans = []
+            for _ in range(rng.randint(0, 12)):
+                start = rng.randint(0, 40)
+                spans.append((start, start + rng.randint(0, 8)))
+            closed = SpanSet(spans)
+            assert list(closed) == self.merged(spans)
+            opened = SpanSet(spans, closed=False)
+            for point in range(50):
+                assert opened.strictly_contains(point) == any(
+                    start < point < end for start, end in spans
+                )
+
+    def test_gaps(self):
+        spans = SpanSet([(3, 5), (5, 7), (10, 12)])
+        assert list(spans) == [(3, 7), (10, 12)]
+        assert spans.gaps(15) == [(0, 3), (7, 10), (12, 15)]
+
+
+class TestColdStart:
+    def test_import_is_lazy(self):
+        code = (
+            "import sys, PTN\n"
+            "from PTN.compiled import compiled_patterns\n"
+            "assert all(o._regex is None for _, os in compiled_patterns for o in os)\n"
+            "assert 'asyncio' not in sys.modules and 'sqlite3' not in sys.modules\n"
+            "assert PTN.ParseCache and 'sqlite3' in sys.modules\n"
+        )
+        root = os.path.join(os.path.dirname(__file__), "..")
+        subprocess.check_call([sys.executable, "-c", code], cwd=root)
+
+    def test_warmup(self):
+        PTN.warmup()
+        for _, options in compiled_patterns:
+            for option in options:
+                assert option._regex is not None
+                assert option.literals == required_literals(option.pattern)
+
+
+class TestFields:
+    @pytest.mark.parametrize(
+        "standardise,coherent_types", [(False, False), (True, False), (True, True)]
+    )
+    def test_matches_full_parse(self, standardise, coherent_types):
+        names = get_names()
+        full = [PTN.parse(name, standardise, coherent_types) for name in names]
+        field_sets = [[key] for key in result_keys]
+        field_sets.append(["title", "year", "season", "episode"])
+        for fields in field_sets:
+            for name, parts in zip(names, full):
+                expected = dict((k, v) for k, v in parts.items() if k in fields)
+                assert (
+                    PTN.parse(name, standardise, coherent_types, fields=fields)
+                    == expected
+                ), (fields, name)
+
+    def test_unknown_field(self):
+        with pytest.raises(ValueError):
+            PTN.parse("Title.2019.1080p", fields=["title", "colour"])
+
+
+class TestPrefilter:
+    def test_literals_are_required(self):
+        # Any option that matches a name must have one of its literals in the name.
+        folds = ["\u0130 \u0131 \u017f \u212a", "The.K\u0131ng.720p"]
+        for name in get_names() + folds:
+            clean_name = name.strip().replace("_", " ")
+            lowered = prefilter_text(clean_name)
+            for key, options in compiled_patterns:
+                for option in options:
+                    if option.regex.search(clean_name):
+                        assert option.literals is None or any(
+                            literal in lowered for literal in option.literals
+                        ), (key, option.index, name)
+
+    def test_case_folds(self):
+        assert prefilter_text("HEVC.DTS.x264.Kelvin") == "hevc.dts.x264.kelvin"
+        assert prefilter_text("\u017fub") == "sub"
+        assert required_literals("READNFO") == ("readnfo",)
+        assert required_literals(r"[hx][\.\s]?264") == ("264",)
+        assert required_literals("HDR(?:10)?") == ("hdr",)
+        assert required_literals(".*") is None
+
+    def test_byte_string_names(self):
+        assert prefilter_text(b"HEVC.DTS.x264") == b"hevc.dts.x264"
+        # Plain string literals are byte strings on Python 2.
+        name = "The.Walking.Dead.S05E03.720p"
+        expected = {
+            "title": "The Walking Dead",
+            "season": 5,
+            "episode": 3,
+            "resolution": "720p",
+        }
+        assert PTN.parse(name) == expected
+        assert PTN.PTN(engine="reference").parse(name, True, False) == expected
+
+
+class TestStandardiser:
+    tokens = (
+        "Ita ENG eng EngSubs FreSub TrueFrench Dk e es nuita Kor Jap xyz Sci-Fi SciFi "
+        "West. Drama Nope"
+    ).split() + [""]
+
+    @staticmethod
+    def reference_match(table, token):
+        for regex, name in table:
+            if re.match(regex, token, re.IGNORECASE):
+                return name
+        return None
+
+    def test_matches_tables(self):
+        standardiser = Standardiser()
+        for token in self.tokens * 2:  # The second time round is cached.
+            assert standardiser.languages.lookup(token) == self.reference_match(
+                langs, token
+            ), token
+            assert standardiser.genres.lookup(token) == self.reference_match(
+                genres, token
+            ), token
+
+    def test_cache_is_bounded(self):
+        standardiser = Standardiser(maxsize=4)
+        standardiser.standardise_languages(self.tokens)
+        assert len(standardiser.languages.cache) <= 4
+        assert standardiser.standardise_languages(["EngSubs", "Ita"]) == [
+            "English",
+            "Italian",
+        ]
+
+    def test_compile_transforms(self):
+        assert compile_transforms(None) is None
+        assert compile_transforms([(None, [])]) is None
+        transform = compile_transforms([("upper", []), ("replace", ["-", ""])])
+        assert transform("web-dl") == "WEBDL"
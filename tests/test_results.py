@@ -0,0 +1,113 @@
+#!/usr/bin/env python
+
+import csv
+import io
+import json
+import os
+import pickle
+
+import PTN
+import pytest
+from PTN.compact import result_keys
+
+
+def get_names():
+    json_input = os.path.join(os.path.dirname(__file__), "files/input.json")
+    with open(json_input) as input_file:
+        return json.load(input_file)
+
+
+class TestCompactResult:
+    @pytest.mark.parametrize("coherent_types", [False, True])
+    @pytest.mark.parametrize("standardise", [False, True])
+    def test_matches_parse(self, standardise, coherent_types):
+        for name in get_names():
+            parts = PTN.parse(name, standardise, coherent_types)
+            result = PTN.parse(name, standardise, coherent_types, compact=True)
+            assert result.to_dict() == parts
+            assert result == parts
+            assert len(result) == len(parts)
+            assert set(result) == set(parts)
+            for key in result_keys:
+                assert (key in result) == (key in parts)
+                assert result.get(key) == parts.get(key)
+
+    def test_mapping_access(self):
+        result = PTN.parse(
+            "The.Walking.Dead.S05E03.720p.HDTV.x264-ASAP[ettv]",
+            coherent_types=True,
+            compact=True,
+        )
+        assert result["title"] == "The Walking Dead"
+        assert result["season"] == [5]
+        with pytest.raises(KeyError):
+            result["year"]
+        # Lists are copies, like in a cached result.
+        result["season"].append(6)
+        assert result["season"] == [5]
+        assert pickle.loads(pickle.dumps(result)) == result
+
+    def test_interned(self):
+        first = PTN.parse("Show.S01E01.1080p.WEB-DL.H264", compact=True)
+        second = PTN.parse("Other.Show.S02E05.1080p.WEB-DL.H264", compact=True)
+        assert first["codec"] is second["codec"]
+        assert first["resolution"] is second["resolution"]
+
+    def test_unknown_keys(self):
+        result = PTN.CompactResult({"title": "Title", "unknown": ["a", "b"]})
+        assert result == {"title": "Title", "unknown": ["a", "b"]}
+        assert "unknown" in result
+
+    def test_parse_many(self):
+        names = get_names()[:50]
+        results = list(PTN.parse_many(names, compact=True))
+        assert all(isinstance(result, PTN.CompactResult) for result in results)
+        assert [result.to_dict() for result in results] == [
+            PTN.parse(name) for name in names
+        ]
+
+
+class TestColumns:
+    @pytest.mark.parametrize("coherent_types", [False, True])
+    @pytest.mark.parametrize("standardise", [False, True])
+    def test_matches_parse(self, standardise, coherent_types):
+        names = get_names()
+        expected = [PTN.parse(name, standardise, coherent_types) for name in names]
+        columns = PTN.parse_columns(names, standardise, coherent_types)
+        assert len(columns) == len(names)
+        assert [columns.row(i) for i in range(len(columns))] == expected
+        assert [json.loads(line) for line in columns.iter_json()] == expected
+
+    def test_column_types(self):
+        columns = PTN.parse_columns(
+            ["Show.S01-S03.720p.REPACK", "Film.2019.1080p", "Show.S02E05.HDTV"]
+        )
+        assert columns["season"].values.typecode == "q"
+        assert columns["season"][0] == [1, 2, 3]
+        assert columns["season"][1] is None
+        assert columns["season"][2] == 2
+        assert list(columns["repack"].valid) == [True, False, False]
+        assert columns["resolution"].values == ["720p", "1080p", None]
+
+    def test_write_csv(self):
+        columns = PTN.parse_columns(["Show.S01-S03.720p.REPACK", "Film.2019.1080p"])
+        out = io.StringIO()
+        columns.write_csv(out)
+        rows = list(csv.DictReader(io.StringIO(out.getvalue())))
+        assert rows[0]["season"] == "[1, 2, 3]"
+        assert rows[0]["repack"] == "True"
+        assert rows[1]["year"] == "2019"
+        assert rows[1]["season"] == ""
+
+    def test_to_numpy(self):
+        numpy = pytest.importorskip("numpy")
+        columns = PTN.parse_columns(["Film.2019.1080p", "Show.S02E05.HDTV"])
+        arrays = columns.to_numpy()
+        assert arrays["year"].dtype == numpy.int64
+        assert arrays["year"][0] == 2019
+        assert arrays["year"].mask.tolist() == [False, True]
+        assert arrays["title"].tolist() == ["Film", "Show"]
+
+    def test_bad_options(self):
+        with pytest.raises(ValueError):
+            PTN.parse_columns([], errors="record")